@@ -6,10 +6,12 @@ Extracts failed email addresses and creates a report.
 
 import os
 import re
+import sys
 import json
 import base64
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Optional
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
@@ -17,6 +19,7 @@ from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import csv
+import heapq
 
 # Use the same scopes as gmail_drafts.py to reuse existing token
 SCOPES = [
@@ -25,20 +28,95 @@ SCOPES = [
     'https://www.googleapis.com/auth/gmail.send'
 ]
 
+# Gmail accepts at most 100 calls per batch request
+BATCH_SIZE = 100
+
+# Worker threads for decoding/parsing fetched bounce messages
+PARSE_WORKERS = 8
+
+# Update the progress line every this many parsed messages
+PROGRESS_EVERY = 64
+
+# Refresh the OAuth token up front if it expires within this window
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+# Stop decoding message parts after this many bytes - the bounce details are
+# always near the top, later parts are the returned original message
+MAX_BODY_BYTES = 64 * 1024
+
+# Senders and subject phrases that identify bounce messages
+BOUNCE_SENDERS = ['mailer-daemon', 'postmaster']
+BOUNCE_SUBJECTS = [
+    'delivery failure', 'undeliverable', 'delivery status', 'mail delivery',
+    'failure notice', 'returned mail', "couldn't be delivered", "wasn't delivered",
+    "address couldn't be found"
+]
+
+# Headers requested in the cheap metadata pass
+METADATA_HEADERS = ['Subject', 'From', 'Date']
+
+# Partial response mask for full fetches - only headers and body data are used
+FULL_MESSAGE_FIELDS = 'id,payload(headers,body/data,parts)'
+
+# Common patterns for failed email addresses in bounce messages, combined into
+# one alternation so the message text is scanned once. Group 1 holds the
+# address for "to:/recipient:/address:" lines, group 2 for "<email> couldn't
+# be found"-style sentences. Addresses and phrases are ASCII, so all patterns
+# work on raw body bytes and skip the UTF-8 decode.
+FAILED_EMAIL_RE = re.compile(
+    rb'(?:to|recipient|address)[:\s]+<?([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})>?'
+    rb'|<?([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})>?\s+'
+    rb'(?:couldn\'t be found|wasn\'t delivered|is unable to receive|does not exist)',
+    re.IGNORECASE
+)
+
+# Error reasons in priority order, with the phrases that indicate them
+ERROR_REASONS = [
+    ("Address not found", ("couldn't be found", "could not be found")),
+    ("Address does not exist", ("doesn't exist", "does not exist")),
+    ("Unable to receive mail", ("unable to receive",)),
+    ("Mailbox full", ("mailbox full", "quota exceeded")),
+    ("Rejected by server", ("rejected",)),
+    ("Blocked", ("blocked",)),
+    ("Marked as spam", ("spam",)),
+]
+
+# Phrase -> error reason, and one regex matching any phrase
+ERROR_REASON_BY_PHRASE = {
+    phrase.encode('ascii'): reason for reason, phrases in ERROR_REASONS for phrase in phrases
+}
+ERROR_REASON_RE = re.compile(b'|'.join(re.escape(phrase) for phrase in ERROR_REASON_BY_PHRASE))
+
+# Any email address (fallback when no bounce pattern matches)
+EMAIL_RE = re.compile(rb'([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})')
+
 
 class BounceChecker:
     """Check Gmail for bounce/failure messages."""
     
+    # Authenticated (service, credentials) per token file, shared by all instances
+    _services: Dict[str, tuple] = {}
+    
     def __init__(self, credentials_file: str = 'credentials.json', token_file: str = 'token.json', gmail_service=None):
         self.credentials_file = credentials_file
         self.token_file = token_file
         self.service = gmail_service  # Can reuse existing service
+        self.creds = None
+    
+    def _save_token(self, creds):
+        """Persist credentials so later runs start with a fresh token."""
+        with open(self.token_file, 'w') as token:
+            token.write(creds.to_json())
     
     def authenticate(self):
         """Authenticate with Gmail API - reuse existing service or create new one."""
         if self.service:
             return self.service
         
+        if self.token_file in self._services:
+            self.service, self.creds = self._services[self.token_file]
+            return self.service
+        
         creds = None
         
         if os.path.exists(self.token_file):
@@ -66,6 +144,7 @@ class BounceChecker:
             if creds and creds.expired and creds.refresh_token:
                 try:
                     creds.refresh(Request())
+                    self._save_token(creds)
                 except Exception as e:
                     print(f"  ⚠ Token refresh failed: {e}")
                     creds = None
@@ -80,12 +159,32 @@ class BounceChecker:
                 self.credentials_file, SCOPES)
             creds = flow.run_local_server(port=0)
             
-            with open(self.token_file, 'w') as token:
-                token.write(creds.to_json())
+            self._save_token(creds)
         
+        self.creds = creds
         self.service = build('gmail', 'v1', credentials=creds)
+        self._services[self.token_file] = (self.service, creds)
         return self.service
     
+    def refresh_token_if_expiring(self):
+        """Refresh the OAuth token now if it expires soon, so a long run doesn't fail midway."""
+        creds = self.creds
+        if not creds or not creds.refresh_token or not creds.expiry:
+            return
+        
+        # google-auth keeps expiry as a naive UTC datetime
+        expiry = creds.expiry
+        if expiry.tzinfo is None:
+            expiry = expiry.replace(tzinfo=timezone.utc)
+        if expiry - datetime.now(timezone.utc) > TOKEN_REFRESH_MARGIN:
+            return
+        
+        try:
+            creds.refresh(Request())
+            self._save_token(creds)
+        except Exception as e:
+            print(f"  ⚠ Token refresh failed: {e}")
+    
     def search_bounce_messages(self, days_back: int = 7) -> List[Dict]:
         """
         Search for bounce/failure messages in Gmail.
@@ -98,12 +197,10 @@ class BounceChecker:
         # Search for bounce-related messages
         # Look for messages from mailer-daemon, postmaster, or containing bounce keywords
         query = (
-            f'(from:mailer-daemon OR from:postmaster OR '
-            f'subject:"delivery failure" OR subject:"undeliverable" OR '
-            f'subject:"delivery status" OR subject:"mail delivery" OR '
-            f'subject:"failure notice" OR subject:"returned mail" OR '
-            f'subject:"couldn\'t be delivered" OR subject:"wasn\'t delivered" OR '
-            f'subject:"address couldn\'t be found") '
+            '(' + ' OR '.join(
+                [f'from:{sender}' for sender in BOUNCE_SENDERS] +
+                [f'subject:"{subject}"' for subject in BOUNCE_SUBJECTS]
+            ) + ') '
             f'newer_than:{days_back}d'
         )
         
@@ -123,17 +220,29 @@ class BounceChecker:
             print(f"Error searching messages: {error}")
             return []
     
-    def get_message_details(self, msg_id: str) -> Optional[Dict]:
-        """Get full message details including body."""
+    def _message_request(self, msg_id: str, fmt: str = 'full'):
+        """Build a messages().get() request for the given format."""
+        if fmt == 'metadata':
+            return self.service.users().messages().get(
+                userId='me',
+                id=msg_id,
+                format='metadata',
+                metadataHeaders=METADATA_HEADERS
+            )
+        return self.service.users().messages().get(
+            userId='me',
+            id=msg_id,
+            format=fmt,
+            fields=FULL_MESSAGE_FIELDS
+        )
+    
+    def get_message_details(self, msg_id: str, fmt: str = 'full') -> Optional[Dict]:
+        """Get message details ('full' includes body, 'metadata' only headers)."""
         if not self.service:
             self.authenticate()
         
         try:
-            message = self.service.users().messages().get(
-                userId='me',
-                id=msg_id,
-                format='full'
-            ).execute()
+            message = self._message_request(msg_id, fmt).execute()
             
             return message
         
@@ -141,139 +250,179 @@ class BounceChecker:
             print(f"Error getting message {msg_id}: {error}")
             return None
     
-    def extract_failed_email(self, message: Dict) -> Optional[str]:
-        """Extract failed email address from bounce message."""
-        # Get headers
+    def get_messages_batch(self, msg_ids: List[str], fmt: str = 'full') -> Dict[str, Dict]:
+        """
+        Get message details for many messages using batch requests.
+        
+        Returns dict of message ID -> message. Messages that failed to
+        fetch are left out.
+        """
+        if not self.service:
+            self.authenticate()
+        
+        messages = {}
+        
+        def on_response(request_id, response, exception):
+            if exception is not None:
+                print(f"Error getting message {request_id}: {exception}")
+                return
+            messages[request_id] = response
+        
+        for start in range(0, len(msg_ids), BATCH_SIZE):
+            chunk = msg_ids[start:start + BATCH_SIZE]
+            batch = self.service.new_batch_http_request(callback=on_response)
+            for msg_id in chunk:
+                batch.add(self._message_request(msg_id, fmt), request_id=msg_id)
+            
+            try:
+                batch.execute()
+            except Exception as e:
+                # Batch endpoint failed as a whole - fetch this chunk one by one
+                print(f"  ⚠ Batch request failed ({e}), fetching messages individually...")
+                for msg_id in chunk:
+                    if msg_id in messages:
+                        continue
+                    message = self.get_message_details(msg_id, fmt)
+                    if message:
+                        messages[msg_id] = message
+        
+        return messages
+    
+    def is_bounce_message(self, message: Dict) -> bool:
+        """Check message headers (metadata is enough) for bounce sender or subject."""
+        sender = self._get_header(message, 'from').lower()
+        subject = self._get_header(message, 'subject').lower()
+        
+        if any(bounce_sender in sender for bounce_sender in BOUNCE_SENDERS):
+            return True
+        return any(bounce_subject in subject for bounce_subject in BOUNCE_SUBJECTS)
+    
+    @staticmethod
+    def _get_header(message: Dict, name: str) -> str:
+        """Get a header value from a message ('' if missing)."""
         headers = message.get('payload', {}).get('headers', [])
-        subject = ''
         for header in headers:
-            if header['name'].lower() == 'subject':
-                subject = header['value']
-                break
-        
-        # Get body
-        body_text = self._get_message_body(message)
-        
-        # Combine subject and body for extraction
-        full_text = f"{subject}\n{body_text}"
-        
-        # Common patterns for failed email addresses
-        patterns = [
-            r'to[:\s]+<?([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})>?',
-            r'recipient[:\s]+<?([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})>?',
-            r'address[:\s]+<?([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})>?',
-            r'<?([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})>?\s+couldn\'t be found',
-            r'<?([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})>?\s+wasn\'t delivered',
-            r'<?([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})>?\s+is unable to receive',
-            r'<?([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})>?\s+does not exist',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, full_text, re.IGNORECASE)
-            if match:
-                email = match.group(1).lower().strip()
-                # Validate it looks like an email
-                if '@' in email and '.' in email.split('@')[1]:
-                    return email
+            if header['name'].lower() == name:
+                return header['value']
+        return ''
+    
+    def _get_full_text(self, message: Dict) -> bytes:
+        """Combine subject and body bytes for extraction."""
+        subject = self._get_header(message, 'subject').encode('utf-8', errors='ignore')
+        body = self._get_message_body(message)
+        return subject + b'\n' + body
+    
+    def extract_failed_email(self, message: Dict) -> Optional[str]:
+        """Extract failed email address from bounce message."""
+        return self._find_failed_email(self._get_full_text(message))
+    
+    def _find_failed_email(self, full_text: bytes) -> Optional[str]:
+        """Find the failed email address in subject + body bytes."""
+        for match in FAILED_EMAIL_RE.finditer(full_text):
+            email = (match.group(1) or match.group(2)).decode('ascii').lower().strip()
+            # Validate it looks like an email
+            if '@' in email and '.' in email.split('@')[1]:
+                return email
         
         # Fallback: look for any email in the message that's not from mailer-daemon
-        emails = re.findall(r'([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', full_text)
+        emails = EMAIL_RE.findall(full_text)
         for email in emails:
-            email_lower = email.lower()
+            email_lower = email.decode('ascii').lower()
             if 'mailer-daemon' not in email_lower and 'postmaster' not in email_lower:
                 return email_lower
         
         return None
     
-    def _get_message_body(self, message: Dict) -> str:
-        """Extract text body from message."""
+    def _get_message_body(self, message: Dict) -> bytes:
+        """Extract raw (undecoded) body bytes from message."""
         payload = message.get('payload', {})
-        body_text = ''
+        chunks = []
+        size = 0
         
-        def extract_part(part):
-            text = ''
-            if part.get('body', {}).get('data'):
-                data = part['body']['data']
+        # Walk parts depth-first in document order, collecting decoded bytes
+        stack = [payload]
+        while stack and size < MAX_BODY_BYTES:
+            part = stack.pop()
+            data = part.get('body', {}).get('data')
+            if data:
                 try:
-                    text = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
+                    chunk = base64.urlsafe_b64decode(data)
+                    chunks.append(chunk)
+                    size += len(chunk)
                 except:
                     pass
             
             if part.get('parts'):
-                for subpart in part['parts']:
-                    text += extract_part(subpart)
-            
-            return text
+                stack.extend(reversed(part['parts']))
         
-        body_text = extract_part(payload)
-        return body_text
+        return b''.join(chunks)
     
     def extract_error_reason(self, message: Dict) -> str:
         """Extract error reason from bounce message."""
-        body_text = self._get_message_body(message)
-        subject = ''
+        return self._find_error_reason(self._get_full_text(message))
+    
+    def _find_error_reason(self, full_text: bytes) -> str:
+        """Find the error reason in subject + body bytes."""
+        # Find every error phrase in one pass, then pick the highest-priority reason
+        found = {ERROR_REASON_BY_PHRASE[phrase] for phrase in ERROR_REASON_RE.findall(full_text.lower())}
+        for reason, _ in ERROR_REASONS:
+            if reason in found:
+                return reason
         
-        headers = message.get('payload', {}).get('headers', [])
-        for header in headers:
-            if header['name'].lower() == 'subject':
-                subject = header['value']
-                break
-        
-        full_text = f"{subject}\n{body_text}".lower()
-        
-        # Common error patterns
-        if "couldn't be found" in full_text or "could not be found" in full_text:
-            return "Address not found"
-        elif "doesn't exist" in full_text or "does not exist" in full_text:
-            return "Address does not exist"
-        elif "unable to receive" in full_text:
-            return "Unable to receive mail"
-        elif "mailbox full" in full_text or "quota exceeded" in full_text:
-            return "Mailbox full"
-        elif "rejected" in full_text:
-            return "Rejected by server"
-        elif "blocked" in full_text:
-            return "Blocked"
-        elif "spam" in full_text:
-            return "Marked as spam"
-        else:
-            return "Unknown error"
+        return "Unknown error"
+    
+    def _parse_bounce(self, message: Dict) -> Optional[Dict]:
+        """
+        Extract failure info from a bounce message, decoding the body once.
+        
+        Returns dict with 'email', 'error_reason', 'date', 'message_id' keys,
+        or None if no failed address was found.
+        """
+        full_text = self._get_full_text(message)
+        
+        failed_email = self._find_failed_email(full_text)
+        if not failed_email:
+            return None
+        
+        return {
+            'email': failed_email,
+            'error_reason': self._find_error_reason(full_text),
+            'date': self._get_header(message, 'date'),
+            'message_id': message.get('id')
+        }
     
     def check_all_bounces(self, days_back: int = 7) -> List[Dict]:
         """Check all bounce messages and extract failed emails."""
+        if not self.service:
+            self.authenticate()
+        self.refresh_token_if_expiring()
+        
         messages = self.search_bounce_messages(days_back)
         failures = []
         
         print(f"Processing {len(messages)} messages...")
         
-        for i, msg_meta in enumerate(messages, 1):
-            if i % 10 == 0:
-                print(f"  Processed {i}/{len(messages)}...")
-            
-            msg_id = msg_meta['id']
-            message = self.get_message_details(msg_id)
-            
-            if not message:
-                continue
-            
-            failed_email = self.extract_failed_email(message)
-            if failed_email:
-                error_reason = self.extract_error_reason(message)
-                
-                # Get date
-                headers = message.get('payload', {}).get('headers', [])
-                date_str = ''
-                for header in headers:
-                    if header['name'].lower() == 'date':
-                        date_str = header['value']
-                        break
+        # Cheap metadata pass first, full body only for confirmed bounces
+        metadata = self.get_messages_batch([msg_meta['id'] for msg_meta in messages], fmt='metadata')
+        msg_ids = [msg_meta['id'] for msg_meta in messages
+                   if msg_meta['id'] in metadata and self.is_bounce_message(metadata[msg_meta['id']])]
+        fetched = self.get_messages_batch(msg_ids)
+        fetched_messages = [fetched[msg_id] for msg_id in msg_ids if msg_id in fetched]
+        
+        # Parse messages in parallel - results come back in message order.
+        # Progress is only written from this thread, on a single updating line.
+        total = len(fetched_messages)
+        with ThreadPoolExecutor(max_workers=PARSE_WORKERS) as executor:
+            for i, failure in enumerate(executor.map(self._parse_bounce, fetched_messages), 1):
+                if i % PROGRESS_EVERY == 0 or i == total:
+                    sys.stdout.write(f"\r  Processed {i}/{total}...")
+                    sys.stdout.flush()
                 
-                failures.append({
-                    'email': failed_email,
-                    'error_reason': error_reason,
-                    'date': date_str,
-                    'message_id': msg_id
-                })
+                if failure:
+                    failures.append(failure)
+        
+        if total:
+            sys.stdout.write("\n")
         
         return failures
 
@@ -292,6 +441,37 @@ def load_campaign_failures() -> List[str]:
         return []
 
 
+def merge_failures(gmail_failures: List[Dict], campaign_failures: List[str]):
+    """
+    Yield unique failure rows sorted by email.
+    
+    Gmail bounces win over campaign failures for the same address, and the
+    first Gmail bounce wins over later ones.
+    """
+    gmail_rows = sorted(
+        ({
+            'email': failure['email'].lower(),
+            'error_reason': failure['error_reason'],
+            'date': failure['date'],
+            'source': 'Gmail bounce'
+        } for failure in gmail_failures),
+        key=lambda x: x['email']
+    )
+    campaign_rows = ({
+        'email': email,
+        'error_reason': 'Campaign failure',
+        'date': '',
+        'source': 'Campaign progress'
+    } for email in sorted(set(email.lower() for email in campaign_failures)))
+    
+    # heapq.merge keeps equal keys in input order, so Gmail rows come first
+    last_email = None
+    for row in heapq.merge(gmail_rows, campaign_rows, key=lambda x: x['email']):
+        if row['email'] != last_email:
+            last_email = row['email']
+            yield row
+
+
 def main():
     import argparse
     
@@ -323,57 +503,32 @@ def main():
     print(f"✓ Found {len(campaign_failures)} failed emails in campaign progress")
     print()
     
-    # Combine and deduplicate
-    all_failures = {}
-    
-    # Add Gmail failures
-    for failure in gmail_failures:
-        email = failure['email'].lower()
-        if email not in all_failures:
-            all_failures[email] = {
-                'email': email,
-                'error_reason': failure['error_reason'],
-                'date': failure['date'],
-                'source': 'Gmail bounce'
-            }
-    
-    # Add campaign failures
-    for email in campaign_failures:
-        email_lower = email.lower()
-        if email_lower not in all_failures:
-            all_failures[email_lower] = {
-                'email': email_lower,
-                'error_reason': 'Campaign failure',
-                'date': '',
-                'source': 'Campaign progress'
-            }
-    
-    # Write to CSV
+    # Write to CSV - merge both sources in email order, deduplicating as we go
     output_file = Path(args.output)
     print(f"Writing results to {output_file}...")
     
+    total_failures = 0
+    error_counts = {}
     with open(output_file, 'w', newline='', encoding='utf-8') as f:
         writer = csv.DictWriter(f, fieldnames=['email', 'error_reason', 'date', 'source'])
         writer.writeheader()
-        for failure in sorted(all_failures.values(), key=lambda x: x['email']):
+        for failure in merge_failures(gmail_failures, campaign_failures):
             writer.writerow(failure)
+            total_failures += 1
+            reason = failure['error_reason']
+            error_counts[reason] = error_counts.get(reason, 0) + 1
     
-    print(f"✓ Wrote {len(all_failures)} unique failed emails to {output_file}")
+    print(f"✓ Wrote {total_failures} unique failed emails to {output_file}")
     print()
     
     # Summary
     print("SUMMARY:")
-    print(f"  Total unique failed emails: {len(all_failures)}")
+    print(f"  Total unique failed emails: {total_failures}")
     print(f"  From Gmail bounces: {len(gmail_failures)}")
     print(f"  From campaign progress: {len(campaign_failures)}")
     print()
     
     # Error reason breakdown
-    error_counts = {}
-    for failure in all_failures.values():
-        reason = failure['error_reason']
-        error_counts[reason] = error_counts.get(reason, 0) + 1
-    
     print("Error breakdown:")
     for reason, count in sorted(error_counts.items(), key=lambda x: -x[1]):
         print(f"  {reason}: {count}")
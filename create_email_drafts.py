@@ -41,7 +41,8 @@ def load_config(config_file='config.yaml'):
     
     try:
         with open(config_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f) or {}
+            # Use the libyaml C loader when available
+            config = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader)) or {}
     except Exception as e:
         print(f"  ⚠ Failed to load config.yaml: {e}")
     
@@ -180,7 +181,7 @@ Examples:
     
     for email in emails:
         contact = pdf_parser.get_contact_by_email(email)
-        csv_row = csv_reader.get_row_by_email(email)
+        csv_row = csv_reader.get_row_by_email(email, email_column)
         
         if contact:
             matched.append({
@@ -213,6 +214,13 @@ Examples:
         print(f"  Using template: {template_file}")
         try:
             processor = TemplateProcessor(template_file)
+            # Artist details are the same for every email, so render them once
+            processor.bind_defaults(
+                artist_name=artist_name,
+                artist_spotify_link=artist_spotify,
+                artist_instagram=artist_instagram,
+                artist_website=artist_website
+            )
         except FileNotFoundError:
             print(f"  ⚠ Template file not found, using default template")
             use_template = False
@@ -228,11 +236,7 @@ Examples:
             # Use markdown template with placeholders
             result = processor.process(
                 contact,
-                artist_name=artist_name,
                 custom_message=custom_message,
-                artist_spotify_link=artist_spotify,
-                artist_instagram=artist_instagram,
-                artist_website=artist_website,
                 additional_info=additional_info,
                 custom_subject=custom_subject
             )
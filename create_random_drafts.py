@@ -5,8 +5,10 @@ Create random Gmail drafts from PDF contacts with genre filtering and email vali
 
 import sys
 import random
+from functools import lru_cache
 from pathlib import Path
-from pdf_parser import PDFParser
+from typing import Iterable, List, Tuple
+from pdf_parser import PDFParser, compile_keywords
 from template_processor import TemplateProcessor
 from gmail_drafts import GmailDraftCreator
 from email_validator import EmailValidator
@@ -19,36 +21,71 @@ def load_config(config_file='config.yaml'):
     config = {}
     config_path = Path(config_file)
     
-    if not config_path.exists():
-        return config
-    
     try:
         with open(config_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f) or {}
+            # Use the libyaml C loader when available
+            config = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader)) or {}
+    except FileNotFoundError:
+        pass
     except Exception as e:
         print(f"  ⚠ Failed to load config.yaml: {e}")
     
     return config
 
 
+@lru_cache(maxsize=None)
+def keyword_set(keywords: tuple):
+    """Lowercased genre keywords as a frozenset for exact token lookups (cached)."""
+    return frozenset(keyword.lower() for keyword in keywords)
+
+
 def filter_by_genres(contact, genre_keywords, exclude_keywords=None):
     """Check if contact genres match any of the specified keywords and don't match exclusions."""
     if not contact.genres or not genre_keywords:
         return False
     
-    genres_lower = contact.genres.lower()
+    # An exact genre token match is settled with a set intersection; the
+    # substring regex is only needed for partial matches like "indie" in "INDIE POP"
+    tokens = contact.genre_tokens
+    genres_lower = None
     
     # First check exclusions - if any excluded genre is present, exclude this contact
     if exclude_keywords:
-        for exclude in exclude_keywords:
-            if exclude.lower() in genres_lower:
-                return False
+        exclude_keywords = tuple(exclude_keywords)
+        if tokens & keyword_set(exclude_keywords):
+            return False
+        genres_lower = contact.genres_lower
+        if compile_keywords(exclude_keywords).search(genres_lower):
+            return False
     
     # Then check if it matches any of the included keywords
-    for keyword in genre_keywords:
-        if keyword.lower() in genres_lower:
-            return True
-    return False
+    genre_keywords = tuple(genre_keywords)
+    if tokens & keyword_set(genre_keywords):
+        return True
+    if genres_lower is None:
+        genres_lower = contact.genres_lower
+    return compile_keywords(genre_keywords).search(genres_lower) is not None
+
+
+def reservoir_sample(items: Iterable, k: int) -> Tuple[List, int]:
+    """
+    Randomly select up to k items from an iterable in a single pass.
+    
+    Only the selected items are kept in memory, so the input can be a
+    generator. Returns the selected items and the number of items seen.
+    """
+    reservoir = []
+    seen = 0
+    for seen, item in enumerate(items, 1):
+        if len(reservoir) < k:
+            reservoir.append(item)
+        else:
+            j = random.randrange(seen)
+            if j < k:
+                reservoir[j] = item
+    # Reservoir slots are filled in input order, so shuffle like random.sample would
+    random.shuffle(reservoir)
+    return reservoir, seen
 
 
 def main():
@@ -88,11 +125,13 @@ def main():
     
     # Parse PDF to get all contacts with emails
     print(f"Step 1: Parsing PDF text file: {pdf_text}")
-    if not Path(pdf_text).exists():
+    try:
+        pdf_data = Path(pdf_text).read_bytes()
+    except FileNotFoundError:
         print(f"ERROR: PDF text file not found: {pdf_text}")
         sys.exit(1)
     
-    pdf_parser = PDFParser(pdf_text)
+    pdf_parser = PDFParser.from_bytes(pdf_data, pdf_text)
     contacts = pdf_parser.parse()
     contacts_with_email = [c for c in contacts if c.email]
     
@@ -100,12 +139,24 @@ def main():
     print(f"  ✓ Found {len(contacts_with_email)} contacts with email addresses")
     print()
     
+    # A validation CSV is authoritative for deliverability, so when one is
+    # provided only the contacts it lists need the genre check
+    use_csv = validate_emails and validation_csv and Path(validation_csv).exists()
+    
     # Step 2: Filter by genres
     print(f"Step 2: Filtering by genres...")
     print(f"  Include: {', '.join(genre_keywords)}")
     if exclude_genres:
         print(f"  Exclude: {', '.join(exclude_genres[:5])}...")
-    genre_filtered = [c for c in contacts_with_email if filter_by_genres(c, genre_keywords, exclude_genres)]
+    candidates = contacts_with_email
+    if use_csv:
+        csv_reader = CSVReader(validation_csv)
+        csv_reader.read()
+        # Normalize the CSV side once, then join on lowercased email (keeps contact order)
+        validated_emails = {email.lower() for email in csv_reader.get_emails()}
+        candidates = [c for c in contacts_with_email if c.email.lower() in validated_emails]
+        print(f"  Checking the {len(candidates)} contacts listed in {validation_csv}")
+    genre_filtered = [c for c in candidates if filter_by_genres(c, genre_keywords, exclude_genres)]
     print(f"  ✓ Found {len(genre_filtered)} contacts matching genre criteria")
     print()
     
@@ -114,37 +165,43 @@ def main():
         sys.exit(1)
     
     # Step 3: Validate emails (if enabled)
-    validated_contacts = genre_filtered
+    # Validated contacts are streamed straight into the Step 4 sample
+    validated_contacts = iter(genre_filtered)
     if validate_emails:
         print("Step 3: Validating emails...")
         
-        # If CSV provided, use validated emails from CSV
-        if validation_csv and Path(validation_csv).exists():
+        # If CSV provided, use validated emails from CSV (already joined in Step 2)
+        if use_csv:
             print(f"  Using validated emails from CSV: {validation_csv}")
-            csv_reader = CSVReader(validation_csv)
-            validated_emails = set(csv_reader.get_emails())
-            validated_contacts = [c for c in genre_filtered if c.email.lower() in validated_emails]
-            print(f"  ✓ Found {len(validated_contacts)} contacts with validated emails from CSV")
+            found_label = "contacts with validated emails from CSV"
         else:
             # Validate emails directly
             validator = EmailValidator()
-            validated_contacts = []
-            for i, contact in enumerate(genre_filtered, 1):
-                if i % 50 == 0:
-                    print(f"  Validating... {i}/{len(genre_filtered)}")
-                result = validator.validate_email(contact.email, check_mx=True, check_disposable=True)
-                if result['valid']:
-                    validated_contacts.append(contact)
-            print(f"  ✓ Found {len(validated_contacts)} contacts with valid emails")
+            results = validator.validate_emails((c.email for c in genre_filtered),
+                                                check_mx=True, check_disposable=True)
+            
+            def valid_contacts():
+                for i, (contact, result) in enumerate(zip(genre_filtered, results), 1):
+                    if i % 50 == 0:
+                        print(f"  Validating... {i}/{len(genre_filtered)}")
+                    if result['valid']:
+                        yield contact
+            
+            validated_contacts = valid_contacts()
+            found_label = "contacts with valid emails"
+    
+    selected_contacts, available = reservoir_sample(validated_contacts, num_drafts)
+    
+    if validate_emails:
+        print(f"  ✓ Found {available} {found_label}")
         print()
     
-    if len(validated_contacts) < num_drafts:
-        print(f"  ⚠ Only {len(validated_contacts)} contacts available, creating {len(validated_contacts)} drafts")
-        num_drafts = len(validated_contacts)
+    if available < num_drafts:
+        print(f"  ⚠ Only {available} contacts available, creating {available} drafts")
+        num_drafts = available
     
     # Step 4: Randomly select contacts
     print(f"Step 4: Randomly selecting {num_drafts} contacts...")
-    selected_contacts = random.sample(validated_contacts, num_drafts)
     
     for i, contact in enumerate(selected_contacts, 1):
         print(f"  {i}. {contact.playlist_name or 'N/A'} - {contact.curator or 'N/A'} ({contact.email})")
@@ -153,21 +210,23 @@ def main():
     # Generate email content
     print("Step 5: Generating email content...")
     processor = TemplateProcessor(template_file)
+    # Artist details are the same for every email, so render them once
+    processor.bind_defaults(
+        artist_name=artist_name,
+        artist_spotify_link=artist_spotify,
+        artist_instagram=artist_instagram,
+        artist_website=artist_website
+    )
     drafts_data = []
     
     for contact in selected_contacts:
-        result = processor.process(
-            contact,
-            artist_name=artist_name,
-            artist_spotify_link=artist_spotify,
-            artist_instagram=artist_instagram,
-            artist_website=artist_website
-        )
+        result = processor.process(contact)
         
         drafts_data.append({
             'to_email': contact.email,
             'subject': result['subject'],
             'body': result['body'],
+            'is_html': True,  # TemplateProcessor always renders HTML
             'contact': contact
         })
     
@@ -199,20 +258,24 @@ def main():
         print(f"  ✓ Sending test emails to: {test_email}")
         print()
         
+        # Send to test email instead of actual recipient for testing
+        send_results = gmail_creator.send_emails_batch([
+            {
+                'to_email': test_email,
+                'subject': f"[TEST] {draft_info['subject']}",
+                'body': draft_info['body'],
+                'is_html': draft_info['is_html'],
+                'cc_email': cc_email
+            }
+            for draft_info in drafts_data
+        ])
+        
         results = []
-        for draft_info in drafts_data:
-            # Send to test email instead of actual recipient for testing
-            message_id = gmail_creator.send_email(
-                to_email=test_email,
-                subject=f"[TEST] {draft_info['subject']}",
-                body=draft_info['body'],
-                cc_email=cc_email
-            )
-            
-            if message_id:
+        for draft_info, sent in zip(drafts_data, send_results):
+            if sent['success']:
                 results.append({
                     'success': True,
-                    'message_id': message_id,
+                    'message_id': sent['message_id'],
                     'to_email': test_email,
                     'original_recipient': draft_info['to_email'],
                     'contact': draft_info['contact'],
@@ -224,7 +287,7 @@ def main():
                     'message_id': None,
                     'to_email': test_email,
                     'original_recipient': draft_info['to_email'],
-                    'error': 'Failed to send email'
+                    'error': sent['error']
                 })
         
         successful = [r for r in results if r['success']]
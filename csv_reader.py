@@ -4,6 +4,7 @@ Read and parse CSV files containing email addresses and additional data.
 """
 
 import csv
+import io
 from typing import List, Dict, Optional
 from pathlib import Path
 
@@ -11,38 +12,53 @@ from pathlib import Path
 class CSVReader:
     """Read and parse CSV files with email addresses."""
     
-    def __init__(self, csv_file: str):
+    def __init__(self, csv_file: str, delimiter: Optional[str] = None):
         self.csv_file = Path(csv_file)
+        self.delimiter = delimiter  # None = auto-detect with csv.Sniffer
         self.rows: List[Dict[str, str]] = []
+        self._rows_by_email: Dict[str, Dict[str, Dict[str, str]]] = {}  # column -> email -> row
+        self._email_column: Optional[str] = None
+        self._email_column_detected = False
     
     def read(self) -> List[Dict[str, str]]:
         """Read CSV file and return list of dictionaries."""
-        if not self.csv_file.exists():
-            raise FileNotFoundError(f"CSV file not found: {self.csv_file}")
+        # Read the file once - the sniffer and the reader share the same text
+        try:
+            data = self.csv_file.read_text(encoding='utf-8', errors='ignore')
+        except FileNotFoundError:
+            raise FileNotFoundError(f"CSV file not found: {self.csv_file}") from None
         
-        rows = []
-        with open(self.csv_file, 'r', encoding='utf-8', errors='ignore') as f:
+        delimiter = self.delimiter
+        if delimiter is None:
             # Try to detect delimiter
-            sample = f.read(1024)
-            f.seek(0)
-            sniffer = csv.Sniffer()
-            delimiter = sniffer.sniff(sample).delimiter
-            
-            reader = csv.DictReader(f, delimiter=delimiter)
-            
-            for row in reader:
-                # Clean up values
-                cleaned_row = {k.strip(): v.strip() if v else '' for k, v in row.items()}
-                rows.append(cleaned_row)
+            delimiter = csv.Sniffer().sniff(data[:1024]).delimiter
+        
+        reader = csv.DictReader(io.StringIO(data), delimiter=delimiter)
+        
+        rows = []
+        for row in reader:
+            # Clean up values
+            cleaned_row = {k.strip(): v.strip() if v else '' for k, v in row.items()}
+            rows.append(cleaned_row)
         
         self.rows = rows
+        self._rows_by_email = {}
+        self._email_column = None
+        self._email_column_detected = False
         return rows
     
     def get_email_column(self) -> Optional[str]:
-        """Auto-detect email column name."""
+        """Auto-detect email column name (detected once per read)."""
         if not self.rows:
             return None
         
+        if not self._email_column_detected:
+            self._email_column = self._detect_email_column()
+            self._email_column_detected = True
+        return self._email_column
+    
+    def _detect_email_column(self) -> Optional[str]:
+        """Find the email column by header name, then by '@' in the first rows."""
         # Common email column names
         email_keywords = ['email', 'e-mail', 'mail', 'contact', 'address']
         
@@ -78,19 +94,22 @@ class CSVReader:
         
         return emails
     
-    def get_row_by_email(self, email: str) -> Optional[Dict[str, str]]:
+    def get_row_by_email(self, email: str, email_column: Optional[str] = None) -> Optional[Dict[str, str]]:
         """Get a row by email address."""
-        email_lower = email.lower().strip()
-        email_column = self.get_email_column()
+        if email_column is None:
+            email_column = self.get_email_column()
         
         if not email_column:
             return None
         
-        for row in self.rows:
-            if row.get(email_column, '').lower().strip() == email_lower:
-                return row
+        if email_column not in self._rows_by_email:
+            # Build the index on first lookup - first row wins for duplicates
+            index = {}
+            for row in self.rows:
+                index.setdefault(row.get(email_column, '').lower().strip(), row)
+            self._rows_by_email[email_column] = index
         
-        return None
+        return self._rows_by_email[email_column].get(email.lower().strip())
 
 
 if __name__ == '__main__':
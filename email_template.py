@@ -4,12 +4,27 @@ Generate email templates for playlist contacts.
 Supports markdown template files with <<field_name>> placeholders.
 """
 
+import html
 import re
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 from pdf_parser import PlaylistContact
 
 
+# Matches <<field_name>> placeholders
+PLACEHOLDER_RE = re.compile(r'<<(\w+)>>')
+
+# One or more whitespace-only lines after a line break
+BLANK_LINES_RE = re.compile(r'\n(?:[^\S\n]*\n)+')
+
+DEFAULT_MESSAGE = "I hope this email finds you well. I'm reaching out to submit my music for consideration for your playlist."
+
+# Fixed parts of the HTML body, shared by every contact
+HTML_PLAYLIST_HEADER = "<p><strong>Playlist Information:</strong></p>"
+HTML_CLOSING = "<p>Thank you for your time and consideration.</p>\n<p>Best regards,<br>"
+
+
 class EmailTemplate:
     """Generate email content from playlist contact data."""
     
@@ -22,25 +37,9 @@ class EmailTemplate:
         return None
     
     @staticmethod
-    def render_template(template_text: str, contact: PlaylistContact,
-                       artist_name: Optional[str] = None,
-                       custom_message: Optional[str] = None,
-                       custom_subject: Optional[str] = None) -> str:
-        """
-        Render template with placeholders.
-        
-        Placeholders:
-        - <<artist_name>>
-        - <<curator_name>>
-        - <<playlist_name>>
-        - <<genres>>
-        - <<followers>>
-        - <<spotify_url>>
-        - <<instagram>>
-        - <<custom_message>>
-        - <<subject>>
-        """
-        # Extract just the email body (skip documentation sections)
+    @lru_cache(maxsize=8)
+    def _strip_template(template_text: str) -> str:
+        """Extract just the email body from a template (skip documentation sections)."""
         lines = template_text.split('\n')
         body_lines = []
         skip_sections = False
@@ -62,37 +61,50 @@ class EmailTemplate:
             
             body_lines.append(line)
         
-        template_text = '\n'.join(body_lines).strip()
+        return '\n'.join(body_lines).strip()
+    
+    @staticmethod
+    def render_template(template_text: str, contact: PlaylistContact,
+                       artist_name: Optional[str] = None,
+                       custom_message: Optional[str] = None,
+                       custom_subject: Optional[str] = None) -> str:
+        """
+        Render template with placeholders.
+        
+        Placeholders:
+        - <<artist_name>>
+        - <<curator_name>>
+        - <<playlist_name>>
+        - <<genres>>
+        - <<followers>>
+        - <<spotify_url>>
+        - <<instagram>>
+        - <<custom_message>>
+        - <<subject>>
+        """
+        # The stripped body only depends on the template text, so it is
+        # computed once and reused for every contact
+        template_text = EmailTemplate._strip_template(template_text)
         
         # Replace placeholders
         replacements = {
-            '<<artist_name>>': artist_name or '[Your Name]',
-            '<<curator_name>>': contact.curator or 'there',
-            '<<playlist_name>>': contact.playlist_name or 'your playlist',
-            '<<genres>>': contact.genres or 'various genres',
-            '<<followers>>': contact.followers or 'many',
-            '<<spotify_url>>': contact.spotify_url or '[Spotify URL]',
-            '<<instagram>>': f"Instagram: {contact.instagram}" if contact.instagram else '',
-            '<<custom_message>>': custom_message or "I hope this email finds you well. I'm reaching out to submit my music for consideration for your playlist."
+            'artist_name': artist_name or '[Your Name]',
+            'curator_name': contact.curator or 'there',
+            'playlist_name': contact.playlist_name or 'your playlist',
+            'genres': contact.genres or 'various genres',
+            'followers': contact.followers or 'many',
+            'spotify_url': contact.spotify_url or '[Spotify URL]',
+            'instagram': f"Instagram: {contact.instagram}" if contact.instagram else '',
+            'custom_message': custom_message or DEFAULT_MESSAGE
         }
         
-        result = template_text
-        for placeholder, value in replacements.items():
-            result = result.replace(placeholder, str(value))
-        
-        # Clean up empty lines
-        lines = result.split('\n')
-        cleaned_lines = []
-        prev_empty = False
-        for line in lines:
-            if line.strip():
-                cleaned_lines.append(line)
-                prev_empty = False
-            elif not prev_empty:
-                cleaned_lines.append('')
-                prev_empty = True
+        # Single pass over the template; unknown placeholders are left as-is
+        result = PLACEHOLDER_RE.sub(
+            lambda m: str(replacements.get(m.group(1), m.group(0))), template_text
+        )
         
-        return '\n'.join(cleaned_lines).strip()
+        # Clean up empty lines - collapse each run of blank lines into one empty line
+        return BLANK_LINES_RE.sub('\n\n', result).strip()
     
     @staticmethod
     def generate_subject(contact: PlaylistContact, custom_subject: Optional[str] = None) -> str:
@@ -153,7 +165,7 @@ class EmailTemplate:
         if custom_message:
             parts.append(custom_message)
         else:
-            parts.append("I hope this email finds you well. I'm reaching out to submit my music for consideration for your playlist.")
+            parts.append(DEFAULT_MESSAGE)
         
         parts.append("")
         
@@ -205,65 +217,63 @@ class EmailTemplate:
                           artist_name: Optional[str] = None,
                           custom_message: Optional[str] = None) -> str:
         """Generate HTML email body."""
-        html_parts = []
-        html_parts.append("<html><body>")
+        # Contact data comes from the PDF, so escape it before it goes into HTML
+        esc = html.escape
+        signature = esc(artist_name) if artist_name else "[Your Name]"
         
         # Greeting
         if contact.curator:
-            html_parts.append(f"<p>Hello {contact.curator},</p>")
+            greeting = f"<p>Hello {esc(contact.curator)},</p>"
         else:
-            html_parts.append("<p>Hello,</p>")
+            greeting = "<p>Hello,</p>"
         
-        # Custom message or default
+        # Custom message or default (the caller's own text, which may contain markup)
         if custom_message:
-            html_parts.append(f"<p>{custom_message.replace(chr(10), '<br>')}</p>")
+            message = f"<p>{custom_message.replace(chr(10), '<br>')}</p>"
         else:
-            html_parts.append("<p>I hope this email finds you well. I'm reaching out to submit my music for consideration for your playlist.</p>")
+            message = f"<p>{DEFAULT_MESSAGE}</p>"
         
         # Playlist information
-        html_parts.append("<p><strong>Playlist Information:</strong></p>")
-        html_parts.append("<ul>")
-        
+        items = []
         if contact.playlist_name:
-            html_parts.append(f"<li><strong>Playlist:</strong> {contact.playlist_name}</li>")
-        
+            items.append(f"<li><strong>Playlist:</strong> {esc(contact.playlist_name)}</li>")
         if contact.genres:
-            html_parts.append(f"<li><strong>Genres:</strong> {contact.genres}</li>")
-        
+            items.append(f"<li><strong>Genres:</strong> {esc(contact.genres)}</li>")
         if contact.followers:
-            html_parts.append(f"<li><strong>Followers:</strong> {contact.followers}</li>")
-        
+            items.append(f"<li><strong>Followers:</strong> {esc(contact.followers)}</li>")
         if contact.spotify_url:
-            html_parts.append(f"<li><strong>Spotify Link:</strong> <a href='{contact.spotify_url}'>{contact.spotify_url}</a></li>")
-        
-        html_parts.append("</ul>")
+            url = esc(contact.spotify_url)
+            items.append(f"<li><strong>Spotify Link:</strong> <a href='{url}'>{url}</a></li>")
         
         # Artist information
-        if artist_name:
-            html_parts.append(f"<p><strong>Artist Name:</strong> {artist_name}</p>")
-        
-        # Closing
-        html_parts.append("<p>Thank you for your time and consideration.</p>")
-        html_parts.append("<p>Best regards,<br>")
-        if artist_name:
-            html_parts.append(artist_name)
-        else:
-            html_parts.append("[Your Name]")
-        html_parts.append("</p>")
+        artist_info = f"<p><strong>Artist Name:</strong> {signature}</p>" if artist_name else ""
         
         # Additional links
+        links = []
         if contact.instagram:
-            html_parts.append(f"<p><a href='{contact.instagram}'>Instagram</a></p>")
-        
+            links.append(f"<p><a href='{esc(contact.instagram)}'>Instagram</a></p>")
         if contact.other_links:
-            html_parts.append("<p><strong>Additional Links:</strong></p><ul>")
+            links.append("<p><strong>Additional Links:</strong></p><ul>")
             for link in contact.other_links:
-                html_parts.append(f"<li><a href='{link}'>{link}</a></li>")
-            html_parts.append("</ul>")
-        
-        html_parts.append("</body></html>")
-        
-        return "\n".join(html_parts)
+                link = esc(link)
+                links.append(f"<li><a href='{link}'>{link}</a></li>")
+            links.append("</ul>")
+        
+        return "\n".join([
+            "<html><body>",
+            greeting,
+            message,
+            HTML_PLAYLIST_HEADER,
+            "<ul>",
+            *items,
+            "</ul>",
+            *([artist_info] if artist_info else []),
+            HTML_CLOSING,
+            signature,
+            "</p>",
+            *links,
+            "</body></html>",
+        ])
 
 
 if __name__ == '__main__':
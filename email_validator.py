@@ -7,10 +7,16 @@ Validates: syntax, domain existence, MX records, disposable emails, role account
 import re
 import dns.resolver
 import socket
-from typing import Dict, List, Optional, Tuple
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import csv
 
 
+# Basic email syntax check, applied to the stripped, lowercased address
+EMAIL_RE = re.compile(r'^[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}$')
+
+
 class EmailValidator:
     """
     Validate email addresses without sending emails.
@@ -24,22 +30,49 @@ class EmailValidator:
     """
     
     # Common disposable email domains
-    DISPOSABLE_DOMAINS = {
+    DISPOSABLE_DOMAINS = frozenset({
         '10minutemail.com', 'guerrillamail.com', 'mailinator.com',
         'tempmail.com', 'throwaway.email', 'temp-mail.org',
         'getnada.com', 'mohmal.com', 'fakeinbox.com',
         'trashmail.com', 'yopmail.com', 'maildrop.cc'
-    }
+    })
     
     # Common role account prefixes
-    ROLE_ACCOUNTS = {
+    ROLE_ACCOUNTS = frozenset({
         'info', 'support', 'help', 'contact', 'hello', 'noreply',
         'no-reply', 'donotreply', 'admin', 'administrator',
         'postmaster', 'webmaster', 'abuse', 'sales', 'marketing'
-    }
+    })
+    
+    # A role name, alone or followed by + or . (longest names tried first)
+    ROLE_RE = re.compile(
+        r'^(' + '|'.join(map(re.escape, sorted(ROLE_ACCOUNTS, key=len, reverse=True))) + r')(?:[+.]|\Z)'
+    )
+    
+    # How long per-domain DNS results are reused (seconds) - failures are
+    # kept for less time since they may be transient
+    DNS_CACHE_TTL = 3600
+    NEGATIVE_DNS_CACHE_TTL = 300
     
-    def __init__(self):
+    def __init__(self, nameservers: Optional[List[str]] = None,
+                 dns_lifetime: Optional[float] = None):
+        """
+        Args:
+            nameservers: DNS servers to query (default: system resolv.conf)
+            dns_lifetime: Max seconds per DNS lookup (default: dnspython's)
+        """
         self.validation_cache = {}
+        # Many contacts share a mail domain - DNS results are cached per domain
+        self.domain_cache = {}  # domain -> (checked_at, check_domain_exists result)
+        self.mx_cache = {}  # domain -> (checked_at, check_mx_record result)
+        
+        # One resolver for every lookup - resolve() is safe to share between
+        # the validate_emails worker threads
+        self.resolver = dns.resolver.Resolver()
+        if nameservers:
+            self.resolver.nameservers = nameservers
+        if dns_lifetime is not None:
+            self.resolver.lifetime = dns_lifetime
     
     def validate_syntax(self, email: str) -> Tuple[bool, Optional[str]]:
         """
@@ -54,9 +87,7 @@ class EmailValidator:
         email = email.strip().lower()
         
         # Basic regex (not perfect but catches most issues)
-        pattern = r'^[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}$'
-        
-        if not re.match(pattern, email):
+        if not EMAIL_RE.match(email):
             return False, "Invalid email format"
         
         # Check for common issues
@@ -86,8 +117,12 @@ class EmailValidator:
         Returns:
             (exists, error_message)
         """
+        return self._cached_lookup(self.domain_cache, domain, self._resolve_domain)
+    
+    def _resolve_domain(self, domain: str) -> Tuple[bool, Optional[str]]:
+        """Look up a domain's address (IPv4 or IPv6)."""
         try:
-            socket.gethostbyname(domain)
+            socket.getaddrinfo(domain, None, proto=socket.IPPROTO_TCP)
             return True, None
         except socket.gaierror:
             return False, f"Domain {domain} does not exist"
@@ -101,14 +136,33 @@ class EmailValidator:
         Returns:
             (has_mx, error_message, mx_records)
         """
+        return self._cached_lookup(self.mx_cache, domain, self._resolve_mx)
+    
+    def _cached_lookup(self, cache: Dict, domain: str, lookup):
+        """Return lookup(domain), reusing a cached result that has not expired yet."""
+        entry = cache.get(domain)
+        now = time.monotonic()
+        if entry is not None:
+            checked_at, result = entry
+            # Results are (ok, error, ...) tuples
+            ttl = self.DNS_CACHE_TTL if result[0] else self.NEGATIVE_DNS_CACHE_TTL
+            if now - checked_at < ttl:
+                return result
+        
+        result = lookup(domain)
+        cache[domain] = (now, result)
+        return result
+    
+    def _resolve_mx(self, domain: str) -> Tuple[bool, Optional[str], Optional[List[str]]]:
+        """Look up MX records (falling back to A records) for a domain."""
         try:
-            mx_records = dns.resolver.resolve(domain, 'MX')
+            mx_records = self.resolver.resolve(domain, 'MX')
             mx_list = [str(mx.exchange).rstrip('.') for mx in mx_records]
             return True, None, mx_list
         except dns.resolver.NoAnswer:
             # No MX record, check for A record (some servers use A record)
             try:
-                dns.resolver.resolve(domain, 'A')
+                self.resolver.resolve(domain, 'A')
                 return True, "No MX record, but A record exists", None
             except:
                 return False, f"No MX or A records for {domain}", None
@@ -119,14 +173,18 @@ class EmailValidator:
     
     def is_disposable(self, email: str) -> Tuple[bool, Optional[str]]:
         """
-        Check if email is from a disposable email service.
+        Check if email is from a disposable email service (or a subdomain of one).
         
         Returns:
             (is_disposable, domain)
         """
         domain = email.split('@')[1].lower()
-        if domain in self.DISPOSABLE_DOMAINS:
-            return True, domain
+        # Check the domain and each parent domain, so subdomains like
+        # foo.mailinator.com are caught too - one set lookup per label
+        labels = domain.split('.')
+        for i in range(len(labels) - 1):
+            if '.'.join(labels[i:]) in self.DISPOSABLE_DOMAINS:
+                return True, domain
         return False, None
     
     def is_role_account(self, email: str) -> Tuple[bool, Optional[str]]:
@@ -137,9 +195,9 @@ class EmailValidator:
             (is_role_account, role_name)
         """
         local = email.split('@')[0].lower()
-        for role in self.ROLE_ACCOUNTS:
-            if local == role or local.startswith(role + '+') or local.startswith(role + '.'):
-                return True, role
+        match = self.ROLE_RE.match(local)
+        if match:
+            return True, match.group(1)
         return False, None
     
     def validate_email(self, email: str, check_mx: bool = True, 
@@ -170,7 +228,7 @@ class EmailValidator:
         }
         
         # Check cache
-        cache_key = f"{email}_{check_mx}_{check_disposable}_{check_role}"
+        cache_key = (email, check_mx, check_disposable, check_role)
         if cache_key in self.validation_cache:
             return self.validation_cache[cache_key]
         
@@ -186,6 +244,28 @@ class EmailValidator:
         # Extract domain
         domain = email.split('@')[1].lower()
         
+        # Disposable email check
+        if check_disposable:
+            is_disp, disp_domain = self.is_disposable(email)
+            result['is_disposable'] = is_disp
+            if is_disp:
+                result['warnings'].append(f"Disposable email domain: {disp_domain}")
+        
+        # Role account check
+        if check_role:
+            is_role, role_name = self.is_role_account(email)
+            result['is_role_account'] = is_role
+            if is_role:
+                result['warnings'].append(f"Role account detected: {role_name}@")
+        
+        if result['is_disposable']:
+            # Already invalid - skip the DNS lookups (None = not checked)
+            result['domain_exists'] = None
+            result['has_mx'] = None
+            result['valid'] = False
+            self.validation_cache[cache_key] = result
+            return result
+        
         # Domain existence
         domain_exists, domain_error = self.check_domain_exists(domain)
         result['domain_exists'] = domain_exists
@@ -201,20 +281,6 @@ class EmailValidator:
             if not has_mx and mx_error:
                 result['warnings'].append(mx_error)
         
-        # Disposable email check
-        if check_disposable:
-            is_disp, disp_domain = self.is_disposable(email)
-            result['is_disposable'] = is_disp
-            if is_disp:
-                result['warnings'].append(f"Disposable email domain: {disp_domain}")
-        
-        # Role account check
-        if check_role:
-            is_role, role_name = self.is_role_account(email)
-            result['is_role_account'] = is_role
-            if is_role:
-                result['warnings'].append(f"Role account detected: {role_name}@")
-        
         # Overall validity
         result['valid'] = (
             result['syntax_valid'] and 
@@ -226,6 +292,37 @@ class EmailValidator:
         self.validation_cache[cache_key] = result
         return result
     
+    def validate_emails(self, emails: Iterable[str], check_mx: bool = True,
+                        check_disposable: bool = True, check_role: bool = False,
+                        max_workers: int = 32) -> Iterator[Dict]:
+        """
+        Validate many emails concurrently.
+        
+        DNS lookups are network-bound, so a thread pool overlaps them.
+        Results are yielded in the same order as the input emails.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            yield from executor.map(
+                lambda email: self.validate_email(email, check_mx, check_disposable, check_role),
+                emails
+            )
+    
+    def prefetch_domains(self, domains: Iterable[str], check_mx: bool = True,
+                         max_workers: int = 32):
+        """
+        Resolve many domains concurrently into the per-domain DNS caches.
+        
+        Each distinct domain is looked up by exactly one worker, so threads
+        never race to resolve the same domain.
+        """
+        def resolve(domain):
+            exists, _ = self.check_domain_exists(domain)
+            if check_mx and exists:
+                self.check_mx_record(domain)
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(resolve, set(domains)))
+    
     def validate_csv(self, csv_file: str, email_column: Optional[str] = None,
                     output_file: Optional[str] = None) -> List[Dict]:
         """
@@ -245,28 +342,36 @@ class EmailValidator:
         if not email_column:
             raise ValueError("Could not determine email column")
         
-        results = []
-        for row in rows:
-            email = row.get(email_column, '').strip()
-            if email:
-                validation = self.validate_email(email)
-                validation['csv_row'] = row
-                results.append(validation)
+        rows = [row for row in rows if row.get(email_column, '').strip()]
+        emails = [row[email_column].strip() for row in rows]
+        
+        # Resolve each distinct domain of the well-formed, non-disposable emails once,
+        # concurrently; the per-row validation below is then served from the DNS caches
+        self.prefetch_domains(
+            email.split('@')[1].lower() for email in emails
+            if self.validate_syntax(email)[0] and not self.is_disposable(email)[0]
+        )
+        
+        # Validate each distinct email once, then fan the result out to its rows
+        # (copied per row, so duplicates keep their own csv_row)
+        validations = {}
+        for email in emails:
+            if email not in validations:
+                validations[email] = self.validate_email(email)
+        
+        results = [dict(validations[email], csv_row=row) for row, email in zip(rows, emails)]
         
         # Write results if output file specified
         if output_file:
+            fields = ['email', 'valid', 'syntax_valid', 'domain_exists',
+                      'has_mx', 'is_disposable', 'is_role_account']
             with open(output_file, 'w', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=[
-                    'email', 'valid', 'syntax_valid', 'domain_exists', 
-                    'has_mx', 'is_disposable', 'is_role_account', 
-                    'warnings', 'errors'
-                ])
-                writer.writeheader()
-                for r in results:
-                    row_data = {k: v for k, v in r.items() if k != 'csv_row'}
-                    row_data['warnings'] = '; '.join(r['warnings'])
-                    row_data['errors'] = '; '.join(r['errors'])
-                    writer.writerow(row_data)
+                writer = csv.writer(f)
+                writer.writerow(fields + ['warnings', 'errors'])
+                writer.writerows(
+                    [r[field] for field in fields] + ['; '.join(r['warnings']), '; '.join(r['errors'])]
+                    for r in results
+                )
         
         return results
 
@@ -10,9 +10,9 @@ import json
 import random
 import argparse
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, TextIO
 import yaml
 
 try:
@@ -21,17 +21,32 @@ try:
 except ImportError:
     pass
 
-from pdf_parser import PDFParser
+from pdf_parser import CONTACTS_CACHE_VERSION, load_contacts_cached
+from follow_instagram import (filter_by_genres, extract_instagram_username,
+                              load_user_id_cache, save_user_id_cache)
+
+
+# Save progress after this many actions (and always at the end of a run)
+CHECKPOINT_EVERY = 5
+
+# Bump when filter_by_genres or extract_instagram_username change, so
+# targets.cache.json is rebuilt rather than served stale
+TARGETS_CACHE_VERSION = 2
 
 
 def load_progress(progress_file: str) -> Dict:
-    """Load progress from JSON file."""
+    """Load progress from JSON file (engaged post IDs are held as sets)."""
     if Path(progress_file).exists():
         with open(progress_file, 'r') as f:
-            return json.load(f)
+            progress = json.load(f)
+        progress['liked_posts'] = set(progress.get('liked_posts', []))
+        progress['commented_posts'] = set(progress.get('commented_posts', []))
+        progress.setdefault('engaged_accounts', {})
+        return progress
     return {
-        'liked_posts': [],
-        'commented_posts': [],
+        'liked_posts': set(),
+        'commented_posts': set(),
+        'engaged_accounts': {},
         'hourly_likes': 0,
         'hourly_comments': 0,
         'daily_likes': 0,
@@ -42,19 +57,99 @@ def load_progress(progress_file: str) -> Dict:
 
 
 def save_progress(progress: Dict, progress_file: str):
-    """Save progress to JSON file."""
-    with open(progress_file, 'w') as f:
-        json.dump(progress, f, indent=2)
+    """Save progress to JSON file atomically, so an interrupted save can't truncate it."""
+    tmp_file = progress_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump({k: (sorted(v) if isinstance(v, set) else v) for k, v in progress.items()},
+                  f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, progress_file)
 
 
-def log_message(message: str, log_file: Optional[str] = None):
-    """Log message to console and optionally to file."""
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+def log_message(message: str, log_fh: Optional[TextIO] = None):
+    """Log message to console and optionally to an open log file."""
+    timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
     log_line = f"[{timestamp}] {message}"
     print(log_line)
-    if log_file:
-        with open(log_file, 'a', encoding='utf-8') as f:
-            f.write(log_line + '\n')
+    if log_fh:
+        log_fh.write(log_line + '\n')
+
+
+def _start_hour(progress: Dict):
+    """Open a new hourly window and reset the hourly counters."""
+    progress['hour_start'] = datetime.now().isoformat()
+    progress['hourly_likes'] = 0
+    progress['hourly_comments'] = 0
+
+
+def _enforce_hourly(progress: Dict, key: str, limit: int, action: str,
+                    log_fh: Optional[TextIO] = None):
+    """Roll the hourly window over, or wait out the rest of it if `key` hit its limit."""
+    hour_start = progress.get('hour_start')
+    if not hour_start:
+        _start_hour(progress)
+        return
+    
+    elapsed = (datetime.now() - datetime.fromisoformat(hour_start)).total_seconds()
+    if elapsed >= 3600:
+        _start_hour(progress)
+        return
+    
+    if progress.get(key, 0) >= limit:
+        log_message(f"Hourly {action} limit reached. Waiting...", log_fh)
+        time.sleep(max(0, 3600 - elapsed))
+        _start_hour(progress)
+
+
+def build_target_usernames(pdf_text_file: str, genre_keywords: List[str],
+                           exclude_genres: List[str]) -> List[str]:
+    """Parse contacts and return Instagram usernames matching the genre filter."""
+    contacts_with_instagram = [c for c in load_contacts_cached(pdf_text_file) if c.instagram]
+    
+    # Apply genre filtering
+    if genre_keywords:
+        contacts_with_instagram = [c for c in contacts_with_instagram 
+                                  if filter_by_genres(c, genre_keywords, exclude_genres)]
+    
+    # Extract usernames
+    target_usernames = []
+    for contact in contacts_with_instagram:
+        username = extract_instagram_username(contact.instagram)
+        if username:
+            target_usernames.append(username)
+    return target_usernames
+
+
+def load_target_usernames(pdf_text_file: str, genre_keywords: List[str],
+                          exclude_genres: List[str],
+                          cache_file: str = 'targets.cache.json') -> List[str]:
+    """Load target usernames, reusing the cached list while the PDF text and genres are unchanged."""
+    stat = os.stat(pdf_text_file)
+    key = {
+        'version': TARGETS_CACHE_VERSION,
+        'contacts_version': CONTACTS_CACHE_VERSION,
+        'pdf_text': pdf_text_file,
+        'mtime': stat.st_mtime,
+        'size': stat.st_size,
+        'genre_keywords': list(genre_keywords or []),
+        'exclude_genres': list(exclude_genres or []),
+    }
+    
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('key') == key:
+            return cached['list']
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        pass
+    
+    target_usernames = build_target_usernames(pdf_text_file, genre_keywords, exclude_genres)
+    tmp_file = cache_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump({'key': key, 'list': target_usernames}, f, indent=2)
+    os.replace(tmp_file, cache_file)
+    return target_usernames
 
 
 def get_comments() -> List[str]:
@@ -99,7 +194,8 @@ def main():
         return
     
     with open(config_path, 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f) or {}
+        # Use the libyaml C loader when available
+        config = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader)) or {}
     
     # Get engagement settings
     engagement_config = config.get('instagram_engagement', {})
@@ -109,19 +205,21 @@ def main():
     max_comments_per_hour = engagement_config.get('max_comments_per_hour', 10)
     max_likes_per_day = engagement_config.get('max_likes_per_day', 150)
     max_comments_per_day = engagement_config.get('max_comments_per_day', 50)
+    reengage_after_days = engagement_config.get('reengage_after_days', 7)
     
     # Progress tracking
     progress_file = 'instagram_engagement_progress.json'
     log_file = 'instagram_engagement.log'
     
     progress = load_progress(progress_file)
+    log_fh = open(log_file, 'a', encoding='utf-8', buffering=1)
     
-    log_message("=" * 60, log_file)
-    log_message("INSTAGRAM ENGAGEMENT CAMPAIGN", log_file)
-    log_message("=" * 60, log_file)
+    log_message("=" * 60, log_fh)
+    log_message("INSTAGRAM ENGAGEMENT CAMPAIGN", log_fh)
+    log_message("=" * 60, log_fh)
     if args.dry_run:
-        log_message("DRY RUN MODE - No actual actions will be performed", log_file)
-    log_message("", log_file)
+        log_message("DRY RUN MODE - No actual actions will be performed", log_fh)
+    log_message("", log_fh)
     
     # Initialize Instagram client
     if not args.dry_run:
@@ -129,8 +227,9 @@ def main():
             from instagrapi import Client
             from instagrapi.exceptions import PleaseWaitFewMinutes, ChallengeRequired
         except ImportError:
-            log_message("ERROR: instagrapi library not installed.", log_file)
-            log_message("Install it with: pip install instagrapi", log_file)
+            log_message("ERROR: instagrapi library not installed.", log_fh)
+            log_message("Install it with: pip install instagrapi", log_fh)
+            log_fh.close()
             return
         
         cl = Client()
@@ -142,48 +241,29 @@ def main():
                 cl.load_settings(session_file)
                 try:
                     cl.get_timeline_feed()
-                    log_message("✓ Using existing session", log_file)
+                    log_message("✓ Using existing session", log_fh)
                 except:
-                    log_message("Session expired, logging in...", log_file)
+                    log_message("Session expired, logging in...", log_fh)
                     cl.login(username, password)
                     cl.dump_settings(session_file)
             except:
                 cl.login(username, password)
                 cl.dump_settings(session_file)
         else:
-            log_message("Logging into Instagram...", log_file)
+            log_message("Logging into Instagram...", log_fh)
             cl.login(username, password)
             cl.dump_settings(session_file)
         
-        log_message("✓ Successfully logged in", log_file)
+        log_message("✓ Successfully logged in", log_fh)
     
-    # Get target accounts from contacts
+    # Get target accounts from contacts (re-parsed only when the PDF text or genres change)
     pdf_text_file = config.get('files', {}).get('pdf_text', 'playlist_contacts.txt')
-    parser = PDFParser(pdf_text_file)
-    all_contacts = parser.parse()
-    
-    # Get genre filtering
-    genre_keywords = config.get('email', {}).get('genre_keywords', [])
-    exclude_genres = config.get('email', {}).get('exclude_genres', [])
+    genre_keywords = tuple(k.lower() for k in config.get('email', {}).get('genre_keywords', []))
+    exclude_genres = tuple(k.lower() for k in config.get('email', {}).get('exclude_genres', []))
+    target_usernames = load_target_usernames(pdf_text_file, genre_keywords, exclude_genres)
     
-    # Filter contacts with Instagram
-    contacts_with_instagram = [c for c in all_contacts if c.instagram]
-    
-    # Apply genre filtering
-    if genre_keywords:
-        from follow_instagram import filter_by_genres, extract_instagram_username
-        contacts_with_instagram = [c for c in contacts_with_instagram 
-                                  if filter_by_genres(c, genre_keywords, exclude_genres)]
-    
-    # Extract usernames
-    target_usernames = []
-    for contact in contacts_with_instagram:
-        username = extract_instagram_username(contact.instagram)
-        if username:
-            target_usernames.append(username)
-    
-    log_message(f"Target accounts: {len(target_usernames)}", log_file)
-    log_message("", log_file)
+    log_message(f"Target accounts: {len(target_usernames)}", log_fh)
+    log_message("", log_fh)
     
     # Get comments
     comments = get_comments()
@@ -192,114 +272,127 @@ def main():
     actions_taken = 0
     likes_count = 0
     comments_count = 0
+    unsaved_actions = 0  # Likes and comments since the last checkpoint
     
-    # Shuffle for randomness
-    random.shuffle(target_usernames)
+    # One RNG for the whole run; bound methods keep lookups out of the loop
+    rng = random.Random()
+    choice, randint, chance = rng.choice, rng.randint, rng.random
     
-    for target_username in target_usernames[:args.limit * 2]:  # Get more accounts than needed
-        if actions_taken >= args.limit:
-            break
-        
-        # Check rate limits
-        now = datetime.now()
-        hour_start = progress.get('hour_start')
-        if hour_start:
-            start_time = datetime.fromisoformat(hour_start)
-            if (now - start_time).total_seconds() >= 3600:
-                progress['hourly_likes'] = 0
-                progress['hourly_comments'] = 0
-                progress['hour_start'] = now.isoformat()
-        else:
-            progress['hour_start'] = now.isoformat()
-        
-        # Check daily limits
-        if progress.get('daily_likes', 0) >= max_likes_per_day:
-            log_message("Daily like limit reached. Stopping.", log_file)
-            break
-        if progress.get('daily_comments', 0) >= max_comments_per_day:
-            log_message("Daily comment limit reached. Stopping.", log_file)
-            break
-        
-        # Check hourly limits
-        if progress.get('hourly_likes', 0) >= max_likes_per_hour:
-            log_message(f"Hourly like limit reached. Waiting...", log_file)
-            time.sleep(3600 - (now - datetime.fromisoformat(progress['hour_start'])).total_seconds())
-            progress['hourly_likes'] = 0
-        
-        if progress.get('hourly_comments', 0) >= max_comments_per_hour:
-            log_message(f"Hourly comment limit reached. Waiting...", log_file)
-            time.sleep(3600 - (now - datetime.fromisoformat(progress['hour_start'])).total_seconds())
-            progress['hourly_comments'] = 0
-        
-        try:
-            if args.dry_run:
-                log_message(f"[DRY RUN] Would engage with @{target_username}", log_file)
-                actions_taken += 1
-                continue
+    # Skip accounts engaged recently, then sample only as many as the run can use
+    cutoff = (datetime.now() - timedelta(days=reengage_after_days)).isoformat()
+    engaged_accounts = progress['engaged_accounts']
+    candidates = [u for u in target_usernames
+                  if engaged_accounts.get(u.lower(), '') < cutoff]
+    picks = rng.sample(candidates, min(len(candidates), args.limit * 2))  # Get more accounts than needed
+    
+    # Resolved user IDs persist across runs so each account is looked up once
+    user_id_cache_file = 'ig_user_id_cache.json'
+    user_id_cache = load_user_id_cache(user_id_cache_file)
+    
+    try:
+        for target_username in picks:
+            if actions_taken >= args.limit:
+                break
             
-            # Get user's recent posts
-            user_id = cl.user_id_from_username(target_username)
-            user_medias = cl.user_medias(user_id, amount=3)  # Get 3 most recent posts
+            # Check daily limits
+            if progress.get('daily_likes', 0) >= max_likes_per_day:
+                log_message("Daily like limit reached. Stopping.", log_fh)
+                break
+            if progress.get('daily_comments', 0) >= max_comments_per_day:
+                log_message("Daily comment limit reached. Stopping.", log_fh)
+                break
             
-            if not user_medias:
-                continue
+            # Check hourly limits
+            _enforce_hourly(progress, 'hourly_likes', max_likes_per_hour, 'like', log_fh)
+            _enforce_hourly(progress, 'hourly_comments', max_comments_per_hour, 'comment', log_fh)
             
-            # Pick a random post
-            media = random.choice(user_medias)
-            media_id = media.pk
-            
-            # Skip if already engaged
-            if media_id in progress.get('liked_posts', []):
-                continue
-            
-            # Like the post
-            if not args.comment_only:
-                try:
-                    cl.media_like(media_id)
-                    log_message(f"✓ Liked @{target_username}'s post", log_file)
-                    progress['liked_posts'].append(media_id)
-                    progress['hourly_likes'] += 1
-                    progress['daily_likes'] += 1
-                    likes_count += 1
+            try:
+                if args.dry_run:
+                    log_message(f"[DRY RUN] Would engage with @{target_username}", log_fh)
                     actions_taken += 1
-                except Exception as e:
-                    log_message(f"✗ Failed to like @{target_username}: {e}", log_file)
-            
-            # Comment on the post
-            if not args.like_only and random.random() < 0.3:  # 30% chance to comment
-                try:
-                    comment_text = random.choice(comments)
-                    cl.media_comment(media_id, comment_text)
-                    log_message(f"✓ Commented on @{target_username}'s post: {comment_text}", log_file)
-                    progress['commented_posts'].append(media_id)
-                    progress['hourly_comments'] += 1
-                    progress['daily_comments'] += 1
-                    comments_count += 1
-                except Exception as e:
-                    log_message(f"✗ Failed to comment on @{target_username}: {e}", log_file)
-            
-            # Save progress
-            save_progress(progress, progress_file)
-            
-            # Random delay
-            delay = random.randint(min_delay, max_delay)
-            time.sleep(delay)
-            
-        except Exception as e:
-            log_message(f"✗ Error with @{target_username}: {e}", log_file)
-            continue
+                    continue
+                
+                # Get user's recent posts
+                cache_key = target_username.lower()
+                user_id = user_id_cache.get(cache_key)
+                if not user_id:
+                    user_id = cl.user_id_from_username(target_username)
+                    user_id_cache[cache_key] = user_id
+                user_medias = cl.user_medias(user_id, amount=3)  # Get 3 most recent posts
+                
+                if not user_medias:
+                    continue
+                
+                # Pick a random post
+                media = choice(user_medias)
+                media_id = media.pk
+                
+                # Skip if already engaged
+                if media_id in progress['liked_posts']:
+                    continue
+                
+                # Like the post
+                if not args.comment_only:
+                    try:
+                        cl.media_like(media_id)
+                        log_message(f"✓ Liked @{target_username}'s post", log_fh)
+                        progress['liked_posts'].add(media_id)
+                        engaged_accounts[target_username.lower()] = datetime.now().isoformat()
+                        progress['hourly_likes'] += 1
+                        progress['daily_likes'] += 1
+                        likes_count += 1
+                        actions_taken += 1
+                        unsaved_actions += 1
+                    except Exception as e:
+                        log_message(f"✗ Failed to like @{target_username}: {e}", log_fh)
+                
+                # Comment on the post
+                if not args.like_only and chance() < 0.3:  # 30% chance to comment
+                    try:
+                        comment_text = choice(comments)
+                        cl.media_comment(media_id, comment_text)
+                        log_message(f"✓ Commented on @{target_username}'s post: {comment_text}", log_fh)
+                        progress['commented_posts'].add(media_id)
+                        engaged_accounts[target_username.lower()] = datetime.now().isoformat()
+                        progress['hourly_comments'] += 1
+                        progress['daily_comments'] += 1
+                        comments_count += 1
+                        unsaved_actions += 1
+                    except Exception as e:
+                        log_message(f"✗ Failed to comment on @{target_username}: {e}", log_fh)
+                
+                # Checkpoint progress every few actions rather than after each one
+                if unsaved_actions >= CHECKPOINT_EVERY:
+                    save_progress(progress, progress_file)
+                    unsaved_actions = 0
+                
+                # Random delay
+                delay = randint(min_delay, max_delay)
+                time.sleep(delay)
+                
+            except Exception as e:
+                log_message(f"✗ Error with @{target_username}: {e}", log_fh)
+                continue
+    
+    except KeyboardInterrupt:
+        log_message("Interrupted - saving progress", log_fh)
+    
+    if not args.dry_run:
+        save_progress(progress, progress_file)
+        save_user_id_cache(user_id_cache, user_id_cache_file)
     
     # Summary
-    log_message("", log_file)
-    log_message("=" * 60, log_file)
-    log_message("ENGAGEMENT SUMMARY", log_file)
-    log_message("=" * 60, log_file)
-    log_message(f"Likes: {likes_count}", log_file)
-    log_message(f"Comments: {comments_count}", log_file)
-    log_message(f"Total actions: {actions_taken}", log_file)
-    log_message("", log_file)
-    log_message(f"Progress saved to: {progress_file}", log_file)
-    log_message(f"Full log saved to: {log_file}", log_file)
+    log_message("", log_fh)
+    log_message("=" * 60, log_fh)
+    log_message("ENGAGEMENT SUMMARY", log_fh)
+    log_message("=" * 60, log_fh)
+    log_message(f"Likes: {likes_count}", log_fh)
+    log_message(f"Comments: {comments_count}", log_fh)
+    log_message(f"Total actions: {actions_taken}", log_fh)
+    log_message("", log_fh)
+    log_message(f"Progress saved to: {progress_file}", log_fh)
+    log_message(f"Full log saved to: {log_file}", log_fh)
+    log_fh.close()
 
 
 if __name__ == '__main__':
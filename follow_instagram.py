@@ -5,14 +5,17 @@ Extracts Instagram handles from contacts and follows them as part of the campaig
 """
 
 import re
+import string
 import time
+import atexit
 import json
 import random
 import argparse
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, TextIO
 import yaml
 
 try:
@@ -21,10 +24,26 @@ try:
 except ImportError:
     pass  # python-dotenv not installed, will use command line args
 
-from pdf_parser import PDFParser
+try:
+    import re2 as re_fast  # google-re2: linear-time matching
+except ImportError:
+    re_fast = re
+
+from pdf_parser import compile_keywords, load_contacts_cached
 from email_validator import EmailValidator
 
 
+# Tried in order: an https?:// profile URL, then instagram.com/username
+# without a scheme, then an @username or bare username. Flags are inline so
+# the same patterns compile under re2 and re.
+INSTAGRAM_URL_RE = re_fast.compile(r'(?i)https?://(?:www\.)?instagram\.com/([^/?\s]+)')
+INSTAGRAM_BARE_URL_RE = re_fast.compile(r'(?i)instagram\.com/([^/?\s]+)')
+INSTAGRAM_HANDLE_RE = re_fast.compile(r'@?([a-zA-Z0-9._]{1,30})')
+
+# Characters allowed in an Instagram username
+HANDLE_CHARS = frozenset(string.ascii_letters + string.digits + '._')
+
+
 def extract_instagram_username(instagram_url: str) -> Optional[str]:
     """Extract username from Instagram URL."""
     if not instagram_url:
@@ -33,29 +52,21 @@ def extract_instagram_username(instagram_url: str) -> Optional[str]:
     # Clean up the URL
     instagram_url = instagram_url.strip()
     
-    # Pattern 1: Full URL with https://www.instagram.com/username
-    match = re.search(r'https?://(?:www\.)?instagram\.com/([^/?\s]+)', instagram_url, re.IGNORECASE)
-    if match:
-        username = match.group(1)
-        if username and len(username) > 0 and len(username) < 31:
-            return username
-    
-    # Pattern 2: instagram.com/username (without http)
-    match = re.search(r'instagram\.com/([^/?\s]+)', instagram_url, re.IGNORECASE)
-    if match:
-        username = match.group(1)
-        if username and len(username) > 0 and len(username) < 31:
-            return username
-    
-    # Pattern 3: @username or just username
-    match = re.search(r'@?([a-zA-Z0-9._]{1,30})', instagram_url)
-    if match:
-        username = match.group(1)
-        # Make sure it's not part of an email or other URL
-        if '@' not in instagram_url[:match.start()] and 'http' not in instagram_url.lower():
-            if username and len(username) > 0 and len(username) < 31:
-                return username
-    
+    # Fast path: a bare "username" or "@username" needs no regex
+    handle = instagram_url[1:] if instagram_url.startswith('@') else instagram_url
+    if 0 < len(handle) <= 30 and HANDLE_CHARS.issuperset(handle) and 'http' not in handle.lower():
+        return handle
+    
+    # Full URL, then instagram.com/username without http
+    for pattern in (INSTAGRAM_URL_RE, INSTAGRAM_BARE_URL_RE):
+        match = pattern.search(instagram_url)
+        if match and len(match.group(1)) < 31:
+            return match.group(1)
+    
+    # @username or just username - make sure it's not part of an email or other URL
+    match = INSTAGRAM_HANDLE_RE.search(instagram_url)
+    if match and '@' not in instagram_url[:match.start()] and 'http' not in instagram_url.lower():
+        return match.group(1)
     return None
 
 
@@ -63,37 +74,124 @@ def filter_by_genres(contact, genre_keywords, exclude_keywords=None):
     """Filter contacts by genre keywords."""
     if not contact.genres or not genre_keywords:
         return False
-    genres_lower = contact.genres.lower()
-    matches = any(keyword.lower() in genres_lower for keyword in genre_keywords)
-    if not matches:
+    genres_lower = contact.genres_lower
+    # One scan of the genre string per keyword list
+    if not compile_keywords(tuple(genre_keywords)).search(genres_lower):
         return False
     if exclude_keywords:
-        excluded = any(excl.lower() in genres_lower for excl in exclude_keywords)
-        if excluded:
+        if compile_keywords(tuple(exclude_keywords)).search(genres_lower):
             return False
     return True
 
 
-def load_progress(progress_file: str) -> Dict:
-    """Load progress from JSON file."""
-    if Path(progress_file).exists():
-        with open(progress_file, 'r') as f:
-            return json.load(f)
+# Write a full progress snapshot every this many accounts; in between,
+# each result is appended to the events log
+PROGRESS_SNAPSHOT_EVERY = 25
+
+
+def new_progress() -> Dict:
+    """Empty progress for a fresh campaign."""
     return {
-        'followed': [],
-        'failed': [],
-        'skipped': [],
+        'followed': set(),
+        'failed': set(),
+        'skipped': set(),
         'hourly_count': 0,
         'daily_count': 0,
         'hour_start': None,
-        'last_follow_time': None
+        'last_follow_time': None,
+        'last_event_ts': None
     }
 
 
-def save_progress(progress: Dict, progress_file: str):
-    """Save progress to JSON file."""
-    with open(progress_file, 'w') as f:
-        json.dump(progress, f, indent=2)
+def load_progress(progress_file: str, events_file: Optional[str] = None) -> Dict:
+    """Load progress from JSON file and replay any events logged since the last snapshot."""
+    progress = new_progress()
+    if Path(progress_file).exists():
+        with open(progress_file, 'r') as f:
+            progress.update(json.load(f))
+        # Username lists are held as sets of lowercased names while running
+        for key in ('followed', 'failed', 'skipped'):
+            progress[key] = {u.lower() for u in progress[key]}
+    
+    if events_file and Path(events_file).exists():
+        # Events up to the snapshot's last one are already in it (the log may
+        # not have been truncated if we crashed right after writing it)
+        snapshot_ts = progress.get('last_event_ts') or ''
+        with open(events_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    # Logs written before truncation rewound may have NUL padding
+                    event = json.loads(line.lstrip('\0'))
+                    if event['ts'] > snapshot_ts:
+                        apply_progress_event(progress, event)
+                except (json.JSONDecodeError, KeyError):
+                    continue  # Partially written last line
+    return progress
+
+
+def save_progress(progress: Dict, progress_file: str, events_fh: Optional[TextIO] = None):
+    """Save progress to JSON file atomically; the snapshot supersedes any logged events."""
+    tmp_file = progress_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump({k: (sorted(v) if isinstance(v, set) else v) for k, v in progress.items()},
+                  f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, progress_file)
+    if events_fh:
+        # Rewind first: truncate() alone leaves the write position at the old end,
+        # and the next event would be written after a run of NUL bytes
+        events_fh.seek(0)
+        events_fh.truncate(0)
+
+
+def apply_progress_event(progress: Dict, event: Dict):
+    """Apply one followed/failed/skipped result to progress."""
+    status = event['status']
+    progress[status].add(event['username'])
+    if status == 'followed':
+        progress['daily_count'] += 1
+        progress['hourly_count'] += 1
+        progress['last_follow_time'] = event['ts']
+        if not progress.get('hour_start'):
+            progress['hour_start'] = event['ts']
+    progress['last_event_ts'] = event['ts']
+
+
+def record_progress(progress: Dict, username: str, status: str,
+                    events_fh: Optional[TextIO] = None):
+    """Record a result in progress and append it to the events log."""
+    event = {'ts': datetime.now().isoformat(), 'username': username, 'status': status}
+    apply_progress_event(progress, event)
+    if events_fh:
+        events_fh.write(json.dumps(event) + '\n')
+        events_fh.flush()
+
+
+def load_user_id_cache(cache_file: str) -> Dict[str, str]:
+    """Load the username -> user_id cache from JSON file."""
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_user_id_cache(cache: Dict[str, str], cache_file: str):
+    """Save the username -> user_id cache atomically."""
+    tmp_file = cache_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(tmp_file, cache_file)
+
+
+def resolve_user_id(cl, user_id_cache: Dict[str, str], username: str) -> str:
+    """Look up a user ID, using the cache first."""
+    user_id = user_id_cache.get(username.lower())
+    if not user_id:
+        user_id = cl.user_id_from_username(username)
+        user_id_cache[username.lower()] = user_id
+    return user_id
 
 
 def calculate_delay(progress: Dict, min_delay: int, max_delay: int, 
@@ -134,14 +232,13 @@ def calculate_delay(progress: Dict, min_delay: int, max_delay: int,
     return delay, None
 
 
-def log_message(message: str, log_file: Optional[str] = None):
-    """Log message to console and optionally to file."""
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+def log_message(message: str, log_fh: Optional[TextIO] = None):
+    """Log message to console and optionally to an open log file."""
+    timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
     log_line = f"[{timestamp}] {message}"
     print(log_line)
-    if log_file:
-        with open(log_file, 'a', encoding='utf-8') as f:
-            f.write(log_line + '\n')
+    if log_fh:
+        log_fh.write(log_line + '\n')
 
 
 def main():
@@ -171,7 +268,8 @@ def main():
         return
     
     with open(config_path, 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f) or {}
+        # Use the libyaml C loader when available
+        config = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader)) or {}
     
     # Get Instagram settings from config (with defaults)
     instagram_config = config.get('instagram', {})
@@ -181,34 +279,30 @@ def main():
     max_per_day = instagram_config.get('max_per_day', 100)
     
     # Get genre filtering settings
-    genre_keywords = config.get('email', {}).get('genre_keywords', [])
-    exclude_genres = config.get('email', {}).get('exclude_genres', [])
+    genre_keywords = tuple(k.lower() for k in config.get('email', {}).get('genre_keywords', []))
+    exclude_genres = tuple(k.lower() for k in config.get('email', {}).get('exclude_genres', []))
     
     # Progress tracking
     progress_file = 'instagram_progress.json'
+    events_file = 'instagram_progress_events.jsonl'
     log_file = 'instagram_follow.log'
     
-    progress = load_progress(progress_file) if args.resume else {
-        'followed': [],
-        'failed': [],
-        'skipped': [],
-        'hourly_count': 0,
-        'daily_count': 0,
-        'hour_start': None,
-        'last_follow_time': None
-    }
+    progress = load_progress(progress_file, events_file) if args.resume else new_progress()
+    
+    # One buffered handle for the whole run, flushed and closed at exit
+    log_fh = open(log_file, 'a', encoding='utf-8')
+    atexit.register(log_fh.close)
     
-    log_message("=" * 60, log_file)
-    log_message("INSTAGRAM FOLLOWING CAMPAIGN", log_file)
-    log_message("=" * 60, log_file)
+    log_message("=" * 60, log_fh)
+    log_message("INSTAGRAM FOLLOWING CAMPAIGN", log_fh)
+    log_message("=" * 60, log_fh)
     if args.dry_run:
-        log_message("DRY RUN MODE - No actual follows will be performed", log_file)
-    log_message("", log_file)
+        log_message("DRY RUN MODE - No actual follows will be performed", log_fh)
+    log_message("", log_fh)
     
     # Parse contacts
     pdf_text_file = config.get('files', {}).get('pdf_text', 'playlist_contacts.txt')
-    parser = PDFParser(pdf_text_file)
-    all_contacts = parser.parse()
+    all_contacts = load_contacts_cached(pdf_text_file)
     
     # Filter contacts with Instagram
     contacts_with_instagram = [c for c in all_contacts if c.instagram]
@@ -218,31 +312,38 @@ def main():
         contacts_with_instagram = [c for c in contacts_with_instagram 
                                   if filter_by_genres(c, genre_keywords, exclude_genres)]
     
-    log_message(f"Total contacts with Instagram: {len(contacts_with_instagram)}", log_file)
+    log_message(f"Total contacts with Instagram: {len(contacts_with_instagram)}", log_fh)
     
     # Extract Instagram usernames
-    instagram_data = []
+    followed_lc = progress['followed']
+    failed_lc = progress['failed']
+    unique_accounts = {}
     for contact in contacts_with_instagram:
         username = extract_instagram_username(contact.instagram)
         if username:
-            # Skip if already followed or failed
-            if username.lower() in [u.lower() for u in progress['followed']]:
-                continue
-            if username.lower() in [u.lower() for u in progress['failed']]:
+            # Skip if already followed, failed, or queued from an earlier contact
+            key = username.lower()
+            if key in followed_lc or key in failed_lc or key in unique_accounts:
                 continue
             
-            instagram_data.append({
+            unique_accounts[key] = {
                 'username': username,
                 'contact': contact
-            })
+            }
+    instagram_data = list(unique_accounts.values())
     
-    log_message(f"Unique Instagram accounts to follow: {len(instagram_data)}", log_file)
+    log_message(f"Unique Instagram accounts to follow: {len(instagram_data)}", log_fh)
     
     if args.limit:
         instagram_data = instagram_data[:args.limit]
-        log_message(f"Limited to first {args.limit} accounts", log_file)
+        log_message(f"Limited to first {args.limit} accounts", log_fh)
+    
+    log_message("", log_fh)
     
-    log_message("", log_file)
+    # Nothing left to follow - don't log in at all
+    if not instagram_data:
+        log_message("No new accounts to follow. Nothing to do.", log_fh)
+        return
     
     # Initialize Instagram client
     if not args.dry_run:
@@ -250,8 +351,8 @@ def main():
             from instagrapi import Client
             from instagrapi.exceptions import LoginRequired, PleaseWaitFewMinutes, ChallengeRequired, BadCredentials, TwoFactorRequired
         except ImportError:
-            log_message("ERROR: instagrapi library not installed.", log_file)
-            log_message("Install it with: pip install instagrapi", log_file)
+            log_message("ERROR: instagrapi library not installed.", log_fh)
+            log_message("Install it with: pip install instagrapi", log_fh)
             return
         
         cl = Client()
@@ -260,14 +361,14 @@ def main():
         # Try to load existing session first
         if Path(session_file).exists():
             try:
-                log_message("Loading existing Instagram session...", log_file)
+                log_message("Loading existing Instagram session...", log_fh)
                 cl.load_settings(session_file)
                 # Try to login with saved session
                 try:
                     cl.get_timeline_feed()  # Test if session is still valid
-                    log_message("✓ Using existing session", log_file)
+                    log_message("✓ Using existing session", log_fh)
                 except:
-                    log_message("Session expired, logging in again...", log_file)
+                    log_message("Session expired, logging in again...", log_fh)
                     raise LoginRequired("Session expired")
             except:
                 # Session invalid, need to login
@@ -275,240 +376,267 @@ def main():
         
         # Login (either new or after failed session)
         try:
-            log_message("Logging into Instagram...", log_file)
+            log_message("Logging into Instagram...", log_fh)
             cl.login(username, password)
             # Save session for next time
             cl.dump_settings(session_file)
-            log_message("✓ Successfully logged in and session saved", log_file)
+            log_message("✓ Successfully logged in and session saved", log_fh)
         except TwoFactorRequired as e:
-            log_message(f"2FA Required: {e}", log_file)
-            log_message("", log_file)
-            log_message("Your account has 2FA enabled. Enter your verification code.", log_file)
-            log_message("Check your authenticator app or email for the code.", log_file)
+            log_message(f"2FA Required: {e}", log_fh)
+            log_message("", log_fh)
+            log_message("Your account has 2FA enabled. Enter your verification code.", log_fh)
+            log_message("Check your authenticator app or email for the code.", log_fh)
             
             try:
                 verification_code = input("Enter your 2FA code: ").strip()
                 if verification_code:
-                    log_message("Logging in with 2FA code...", log_file)
+                    log_message("Logging in with 2FA code...", log_fh)
                     cl.login(username, password, verification_code=verification_code)
                     cl.dump_settings(session_file)
-                    log_message("✓ Successfully logged in with 2FA and session saved", log_file)
+                    log_message("✓ Successfully logged in with 2FA and session saved", log_fh)
                 else:
-                    log_message("No verification code provided. Exiting.", log_file)
+                    log_message("No verification code provided. Exiting.", log_fh)
                     return
             except Exception as twofa_error:
-                log_message(f"Failed to login with 2FA: {twofa_error}", log_file)
-                log_message("", log_file)
-                log_message("SOLUTIONS:", log_file)
-                log_message("1. Make sure the code is correct (6 digits from authenticator app)", log_file)
-                log_message("2. Codes expire quickly - enter it immediately", log_file)
-                log_message("3. Or temporarily disable 2FA in Instagram settings", log_file)
+                log_message(f"Failed to login with 2FA: {twofa_error}", log_fh)
+                log_message("", log_fh)
+                log_message("SOLUTIONS:", log_fh)
+                log_message("1. Make sure the code is correct (6 digits from authenticator app)", log_fh)
+                log_message("2. Codes expire quickly - enter it immediately", log_fh)
+                log_message("3. Or temporarily disable 2FA in Instagram settings", log_fh)
                 return
         except ChallengeRequired as e:
-            log_message(f"2FA Challenge Required: {e}", log_file)
-            log_message("", log_file)
-            log_message("Instagram requires 2FA verification code.", log_file)
-            log_message("Check your email or authenticator app for the code.", log_file)
+            log_message(f"2FA Challenge Required: {e}", log_fh)
+            log_message("", log_fh)
+            log_message("Instagram requires 2FA verification code.", log_fh)
+            log_message("Check your email or authenticator app for the code.", log_fh)
             
             # Try to handle 2FA challenge
             try:
                 # Try to resolve challenge (sends code to email/SMS)
-                log_message("Attempting to resolve challenge...", log_file)
+                log_message("Attempting to resolve challenge...", log_fh)
                 try:
                     challenge = cl.challenge_resolve()
                     if challenge:
-                        log_message("Challenge code sent. Check your email or SMS.", log_file)
+                        log_message("Challenge code sent. Check your email or SMS.", log_fh)
                 except:
-                    log_message("Challenge already initiated or alternative method needed.", log_file)
+                    log_message("Challenge already initiated or alternative method needed.", log_fh)
                 
                 challenge_code = input("Enter your 2FA code: ").strip()
                 if challenge_code:
-                    log_message("Submitting 2FA code...", log_file)
+                    log_message("Submitting 2FA code...", log_fh)
                     cl.challenge_code_handler(username, challenge_code)
                     cl.dump_settings(session_file)
-                    log_message("✓ Successfully logged in with 2FA and session saved", log_file)
+                    log_message("✓ Successfully logged in with 2FA and session saved", log_fh)
                 else:
-                    log_message("No code provided. Exiting.", log_file)
+                    log_message("No code provided. Exiting.", log_fh)
                     return
             except Exception as challenge_error:
-                log_message(f"Failed to complete 2FA challenge: {challenge_error}", log_file)
-                log_message("", log_file)
-                log_message("ALTERNATIVE SOLUTIONS:", log_file)
-                log_message("1. Temporarily disable 2FA in Instagram settings (Security → Two-Factor Authentication)", log_file)
-                log_message("2. Use an app-specific password if available", log_file)
-                log_message("3. Log in manually in browser first, complete 2FA, then try script", log_file)
-                log_message("4. Wait 24 hours if IP is blacklisted, then try again", log_file)
+                log_message(f"Failed to complete 2FA challenge: {challenge_error}", log_fh)
+                log_message("", log_fh)
+                log_message("ALTERNATIVE SOLUTIONS:", log_fh)
+                log_message("1. Temporarily disable 2FA in Instagram settings (Security → Two-Factor Authentication)", log_fh)
+                log_message("2. Use an app-specific password if available", log_fh)
+                log_message("3. Log in manually in browser first, complete 2FA, then try script", log_fh)
+                log_message("4. Wait 24 hours if IP is blacklisted, then try again", log_fh)
                 return
         except BadCredentials as e:
-            log_message(f"ERROR: Invalid credentials: {e}", log_file)
-            log_message("Check your username and password in .env file", log_file)
+            log_message(f"ERROR: Invalid credentials: {e}", log_fh)
+            log_message("Check your username and password in .env file", log_fh)
             return
         except PleaseWaitFewMinutes as e:
-            log_message(f"ERROR: Rate limited by Instagram: {e}", log_file)
-            log_message("Wait a few minutes and try again", log_file)
+            log_message(f"ERROR: Rate limited by Instagram: {e}", log_fh)
+            log_message("Wait a few minutes and try again", log_fh)
             return
         except Exception as e:
             error_msg = str(e)
-            log_message(f"ERROR: Failed to login to Instagram: {error_msg}", log_file)
+            log_message(f"ERROR: Failed to login to Instagram: {error_msg}", log_fh)
             
             if "blacklist" in error_msg.lower() or "ip" in error_msg.lower():
-                log_message("", log_file)
-                log_message("IP ADDRESS BLOCKED BY INSTAGRAM", log_file)
-                log_message("SOLUTIONS:", log_file)
-                log_message("1. Wait 24-48 hours for IP to be unblocked", log_file)
-                log_message("2. Use a VPN to change your IP address", log_file)
-                log_message("3. Log into Instagram manually in a browser first", log_file)
-                log_message("4. Complete any security challenges", log_file)
-                log_message("5. Try again after waiting", log_file)
+                log_message("", log_fh)
+                log_message("IP ADDRESS BLOCKED BY INSTAGRAM", log_fh)
+                log_message("SOLUTIONS:", log_fh)
+                log_message("1. Wait 24-48 hours for IP to be unblocked", log_fh)
+                log_message("2. Use a VPN to change your IP address", log_fh)
+                log_message("3. Log into Instagram manually in a browser first", log_fh)
+                log_message("4. Complete any security challenges", log_fh)
+                log_message("5. Try again after waiting", log_fh)
             elif "password" in error_msg.lower() or "credentials" in error_msg.lower():
-                log_message("", log_file)
-                log_message("Check your credentials in .env file:", log_file)
-                log_message(f"  IG_USERNAME={username}", log_file)
-                log_message("  IG_PASSWORD=***", log_file)
-                log_message("", log_file)
-                log_message("Also ensure:", log_file)
-                log_message("- 2FA is disabled on your Instagram account", log_file)
-                log_message("- You can log in manually in a browser", log_file)
+                log_message("", log_fh)
+                log_message("Check your credentials in .env file:", log_fh)
+                log_message(f"  IG_USERNAME={username}", log_fh)
+                log_message("  IG_PASSWORD=***", log_fh)
+                log_message("", log_fh)
+                log_message("Also ensure:", log_fh)
+                log_message("- 2FA is disabled on your Instagram account", log_fh)
+                log_message("- You can log in manually in a browser", log_fh)
             else:
-                log_message("", log_file)
-                log_message("TROUBLESHOOTING:", log_file)
-                log_message("1. Verify credentials work in browser", log_file)
-                log_message("2. Disable 2FA on Instagram account", log_file)
-                log_message("3. Wait and try again later", log_file)
+                log_message("", log_fh)
+                log_message("TROUBLESHOOTING:", log_fh)
+                log_message("1. Verify credentials work in browser", log_fh)
+                log_message("2. Disable 2FA on Instagram account", log_fh)
+                log_message("3. Wait and try again later", log_fh)
             return
     
+    # Fetch our following list once; it is kept current as we follow
+    already_following = set()
+    if not args.dry_run:
+        try:
+            already_following = set(cl.user_following(cl.user_id).keys())
+        except Exception as e:
+            log_message(f"⚠ Could not load following list: {e}", log_fh)
+    
+    # Resolved user IDs are shared with engage_instagram.py and persist across runs
+    user_id_cache_file = 'ig_user_id_cache.json'
+    user_id_cache = load_user_id_cache(user_id_cache_file)
+    
+    # Results are appended here between snapshots (a fresh run starts a new log)
+    events_fh = None
+    if not args.dry_run:
+        events_fh = open(events_file, 'a' if args.resume else 'w', encoding='utf-8')
+        if not args.resume:
+            # Replace the previous campaign's snapshot before logging any events
+            save_progress(progress, progress_file, events_fh)
+    
+    # Single worker: the client is only used by it while the main thread sleeps
+    lookup_pool = ThreadPoolExecutor(max_workers=1)
+    
     # Follow accounts
     successful = []
     failed = []
     skipped = []
     
-    for i, data in enumerate(instagram_data, 1):
-        username = data['username']
-        contact = data['contact']
-        
-        # Check rate limits
-        delay, reason = calculate_delay(progress, min_delay, max_delay, max_per_hour, max_per_day)
-        
-        if reason:
-            if reason == "daily limit reached":
-                log_message(f"[{i}/{len(instagram_data)}] Daily limit reached. Stopping.", log_file)
-                break
-            elif reason == "hourly limit reached":
-                log_message(f"[{i}/{len(instagram_data)}] Hourly limit reached. Waiting {delay/60:.1f} minutes...", log_file)
+    try:
+        for i, data in enumerate(instagram_data, 1):
+            username = data['username']
+            contact = data['contact']
+            
+            # Check rate limits
+            delay, reason = calculate_delay(progress, min_delay, max_delay, max_per_hour, max_per_day)
+            
+            if reason:
+                if reason == "daily limit reached":
+                    log_message(f"[{i}/{len(instagram_data)}] Daily limit reached. Stopping.", log_fh)
+                    break
+                elif reason == "hourly limit reached":
+                    log_message(f"[{i}/{len(instagram_data)}] Hourly limit reached. Waiting {delay/60:.1f} minutes...", log_fh)
+                    time.sleep(delay)
+                    progress['hourly_count'] = 0
+                    progress['hour_start'] = datetime.now().isoformat()
+            
+            # Resolve the user ID in the background while we wait out the delay
+            user_id_future = None
+            if not args.dry_run:
+                user_id_future = lookup_pool.submit(resolve_user_id, cl, user_id_cache, username)
+            
+            # Wait before following (except for first account)
+            if i > 1:
+                log_message(f"[{i}/{len(instagram_data)}] Waiting {delay:.1f} seconds before next follow...", log_fh)
                 time.sleep(delay)
-                progress['hourly_count'] = 0
-                progress['hour_start'] = datetime.now().isoformat()
-        
-        # Wait before following (except for first account)
-        if i > 1:
-            log_message(f"[{i}/{len(instagram_data)}] Waiting {delay:.1f} seconds before next follow...", log_file)
-            time.sleep(delay)
-        
-        log_message(f"[{i}/{len(instagram_data)}] Following: @{username}", log_file)
-        log_message(f"  Playlist: {contact.playlist_name or 'N/A'}", log_file)
-        log_message(f"  Email: {contact.email or 'N/A'}", log_file)
-        
-        if args.dry_run:
-            log_message(f"  [DRY RUN] Would follow @{username}", log_file)
-            successful.append({
-                'username': username,
-                'contact': contact
-            })
-            progress['followed'].append(username.lower())
-            progress['daily_count'] += 1
-            progress['hourly_count'] += 1
-            progress['last_follow_time'] = datetime.now().isoformat()
-            if not progress.get('hour_start'):
-                progress['hour_start'] = datetime.now().isoformat()
-        else:
-            try:
-                from instagrapi.exceptions import PleaseWaitFewMinutes, ChallengeRequired
-                
-                # Get user ID from username
-                user_id = cl.user_id_from_username(username)
-                
-                # Check if already following
-                following = cl.user_following(cl.user_id)
-                if user_id in following:
-                    log_message(f"  ⚠ Already following @{username}", log_file)
-                    skipped.append({
+            
+            log_message(f"[{i}/{len(instagram_data)}] Following: @{username}", log_fh)
+            log_message(f"  Playlist: {contact.playlist_name or 'N/A'}", log_fh)
+            log_message(f"  Email: {contact.email or 'N/A'}", log_fh)
+            
+            if args.dry_run:
+                log_message(f"  [DRY RUN] Would follow @{username}", log_fh)
+                successful.append({
+                    'username': username,
+                    'contact': contact
+                })
+                record_progress(progress, username.lower(), 'followed')
+            else:
+                try:
+                    from instagrapi.exceptions import PleaseWaitFewMinutes, ChallengeRequired
+                    
+                    # Get user ID from username (resolved during the wait)
+                    user_id = user_id_future.result()
+                    
+                    # Check if already following
+                    if user_id in already_following:
+                        log_message(f"  ⚠ Already following @{username}", log_fh)
+                        skipped.append({
+                            'username': username,
+                            'contact': contact,
+                            'reason': 'already_following'
+                        })
+                        record_progress(progress, username.lower(), 'skipped', events_fh)
+                    else:
+                        # Follow the user
+                        cl.user_follow(user_id)
+                        already_following.add(user_id)
+                        log_message(f"  ✓ Successfully followed @{username}", log_fh)
+                        successful.append({
+                            'username': username,
+                            'contact': contact
+                        })
+                        record_progress(progress, username.lower(), 'followed', events_fh)
+                    
+                except PleaseWaitFewMinutes as e:
+                    log_message(f"  ✗ Rate limited: {e}. Waiting 5 minutes...", log_fh)
+                    time.sleep(300)  # Wait 5 minutes
+                    failed.append({
                         'username': username,
                         'contact': contact,
-                        'reason': 'already_following'
+                        'error': f'Rate limited: {e}'
                     })
-                    progress['skipped'].append(username.lower())
-                else:
-                    # Follow the user
-                    cl.user_follow(user_id)
-                    log_message(f"  ✓ Successfully followed @{username}", log_file)
-                    successful.append({
+                    record_progress(progress, username.lower(), 'failed', events_fh)
+                    
+                except ChallengeRequired as e:
+                    log_message(f"  ✗ Challenge required: {e}", log_fh)
+                    log_message("  Instagram requires additional verification. Please login manually and try again.", log_fh)
+                    failed.append({
                         'username': username,
-                        'contact': contact
+                        'contact': contact,
+                        'error': 'Challenge required'
                     })
-                    progress['followed'].append(username.lower())
-                    progress['daily_count'] += 1
-                    progress['hourly_count'] += 1
-                    progress['last_follow_time'] = datetime.now().isoformat()
-                    if not progress.get('hour_start'):
-                        progress['hour_start'] = datetime.now().isoformat()
-                
-                # Save progress after each follow
-                save_progress(progress, progress_file)
-                
-            except PleaseWaitFewMinutes as e:
-                log_message(f"  ✗ Rate limited: {e}. Waiting 5 minutes...", log_file)
-                time.sleep(300)  # Wait 5 minutes
-                failed.append({
-                    'username': username,
-                    'contact': contact,
-                    'error': f'Rate limited: {e}'
-                })
-                progress['failed'].append(username.lower())
-                save_progress(progress, progress_file)
-                
-            except ChallengeRequired as e:
-                log_message(f"  ✗ Challenge required: {e}", log_file)
-                log_message("  Instagram requires additional verification. Please login manually and try again.", log_file)
-                failed.append({
-                    'username': username,
-                    'contact': contact,
-                    'error': 'Challenge required'
-                })
-                progress['failed'].append(username.lower())
-                save_progress(progress, progress_file)
-                break  # Stop if challenge required
-                
-            except Exception as e:
-                log_message(f"  ✗ Error: {e}", log_file)
-                failed.append({
-                    'username': username,
-                    'contact': contact,
-                    'error': str(e)
-                })
-                progress['failed'].append(username.lower())
-                save_progress(progress, progress_file)
-        
-        log_message("", log_file)
+                    record_progress(progress, username.lower(), 'failed', events_fh)
+                    break  # Stop if challenge required
+                    
+                except Exception as e:
+                    log_message(f"  ✗ Error: {e}", log_fh)
+                    failed.append({
+                        'username': username,
+                        'contact': contact,
+                        'error': str(e)
+                    })
+                    record_progress(progress, username.lower(), 'failed', events_fh)
+            
+            log_message("", log_fh)
+            
+            # Periodic snapshot so the events log stays short
+            if events_fh and i % PROGRESS_SNAPSHOT_EVERY == 0:
+                save_progress(progress, progress_file, events_fh)
+    
+    except KeyboardInterrupt:
+        log_message("Interrupted - saving progress", log_fh)
+    
+    lookup_pool.shutdown()
+    
+    if not args.dry_run:
+        save_progress(progress, progress_file, events_fh)
+        events_fh.close()
+        save_user_id_cache(user_id_cache, user_id_cache_file)
     
     # Final summary
-    log_message("=" * 60, log_file)
-    log_message("CAMPAIGN SUMMARY", log_file)
-    log_message("=" * 60, log_file)
-    log_message(f"Successfully followed: {len(successful)}", log_file)
-    log_message(f"Failed: {len(failed)}", log_file)
-    log_message(f"Skipped: {len(skipped)}", log_file)
-    log_message("", log_file)
+    log_message("=" * 60, log_fh)
+    log_message("CAMPAIGN SUMMARY", log_fh)
+    log_message("=" * 60, log_fh)
+    log_message(f"Successfully followed: {len(successful)}", log_fh)
+    log_message(f"Failed: {len(failed)}", log_fh)
+    log_message(f"Skipped: {len(skipped)}", log_fh)
+    log_message("", log_fh)
     
     if failed:
-        log_message("Failed accounts:", log_file)
+        log_message("Failed accounts:", log_fh)
         for fail in failed[:10]:  # Show first 10
-            log_message(f"  @{fail['username']}: {fail.get('error', 'Unknown error')}", log_file)
+            log_message(f"  @{fail['username']}: {fail.get('error', 'Unknown error')}", log_fh)
         if len(failed) > 10:
-            log_message(f"  ... and {len(failed) - 10} more", log_file)
+            log_message(f"  ... and {len(failed) - 10} more", log_fh)
     
-    log_message("", log_file)
-    log_message(f"Progress saved to: {progress_file}", log_file)
-    log_message(f"Full log saved to: {log_file}", log_file)
+    log_message("", log_fh)
+    log_message(f"Progress saved to: {progress_file}", log_fh)
+    log_message(f"Full log saved to: {log_file}", log_fh)
 
 
 if __name__ == '__main__':
@@ -9,7 +9,6 @@ import json
 import random
 import argparse
 import os
-from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Optional
 import yaml
@@ -33,12 +32,22 @@ except ImportError:
     print("Also need ChromeDriver: https://chromedriver.chromium.org/")
     exit(1)
 
-from pdf_parser import PDFParser
+from pdf_parser import load_contacts_cached
+from follow_instagram import filter_by_genres, extract_instagram_username
+
+
+# Profile header button labelled exactly "Follow" (not "Following" / "Follow Back");
+# the label sits either directly in the button or in a nested div
+FOLLOW_BUTTON_XPATH = "//button[.//div[text()='Follow']] | //button[text()='Follow']"
+FOLLOWED_BUTTON_XPATH = (
+    "//button[.//div[text()='Following' or text()='Requested']]"
+    " | //button[text()='Following' or text()='Requested']"
+)
 
 
 def log_message(message: str, log_file: Optional[str] = None):
     """Log message to console and optionally to file."""
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
     log_line = f"[{timestamp}] {message}"
     print(log_line)
     if log_file:
@@ -46,13 +55,17 @@ def log_message(message: str, log_file: Optional[str] = None):
             f.write(log_line + '\n')
 
 
-def setup_driver(headless=False):
+def setup_driver(headless=False, profile_dir=None):
     """Setup Chrome driver with options to avoid detection."""
     chrome_options = Options()
     
     if headless:
         chrome_options.add_argument('--headless')
     
+    # Persistent profile keeps the Instagram login cookies between runs
+    if profile_dir:
+        chrome_options.add_argument(f'--user-data-dir={profile_dir}')
+    
     # Options to avoid detection
     chrome_options.add_argument('--disable-blink-features=AutomationControlled')
     chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
@@ -65,11 +78,32 @@ def setup_driver(headless=False):
     return driver
 
 
+def wait_for(driver, condition, timeout=10) -> bool:
+    """Wait until condition holds; return False instead of raising on timeout."""
+    try:
+        WebDriverWait(driver, timeout).until(condition)
+        return True
+    except TimeoutException:
+        return False
+
+
+def login_finished(driver):
+    """Condition: we've left the login form (logged in or 2FA prompt shown)."""
+    return ("login" not in driver.current_url
+            or driver.find_elements(By.NAME, "verificationCode"))
+
+
+def is_logged_in(driver) -> bool:
+    """Check whether the browser profile already has a logged-in session."""
+    driver.get("https://www.instagram.com/")
+    return wait_for(driver, EC.presence_of_element_located(
+        (By.CSS_SELECTOR, "svg[aria-label='Home']")), timeout=5)
+
+
 def login_instagram(driver, username, password, twofa_code=None):
     """Login to Instagram via browser."""
     log_message("Opening Instagram login page...")
     driver.get("https://www.instagram.com/accounts/login/")
-    time.sleep(3)
     
     try:
         # Enter username
@@ -87,7 +121,7 @@ def login_instagram(driver, username, password, twofa_code=None):
         # Click login
         login_button = driver.find_element(By.CSS_SELECTOR, "button[type='submit']")
         login_button.click()
-        time.sleep(5)
+        wait_for(driver, login_finished)
         
         # Check for 2FA
         try:
@@ -98,14 +132,14 @@ def login_instagram(driver, username, password, twofa_code=None):
                 time.sleep(1)
                 submit_button = driver.find_element(By.CSS_SELECTOR, "button[type='button']")
                 submit_button.click()
-                time.sleep(5)
+                wait_for(driver, lambda d: "login" not in d.current_url)
             else:
                 twofa_code = input("Enter your 2FA code: ").strip()
                 twofa_input.send_keys(twofa_code)
                 time.sleep(1)
                 submit_button = driver.find_element(By.CSS_SELECTOR, "button[type='button']")
                 submit_button.click()
-                time.sleep(5)
+                wait_for(driver, lambda d: "login" not in d.current_url)
         except NoSuchElementException:
             pass  # No 2FA required
         
@@ -127,14 +161,17 @@ def follow_user(driver, username):
     try:
         log_message(f"Following @{username}...")
         driver.get(f"https://www.instagram.com/{username}/")
-        time.sleep(3)
         
         # Find follow button
         follow_button = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Follow')]"))
+            EC.element_to_be_clickable((By.XPATH, FOLLOW_BUTTON_XPATH))
         )
         follow_button.click()
-        time.sleep(2)
+        
+        # Wait for the button to re-render as Following (or Requested for private accounts)
+        if not wait_for(driver, EC.presence_of_element_located((By.XPATH, FOLLOWED_BUTTON_XPATH))):
+            log_message(f"✗ Follow for @{username} was not confirmed")
+            return False
         
         log_message(f"✓ Followed @{username}")
         return True
@@ -154,6 +191,8 @@ def main():
     parser.add_argument('--twofa', default=None, help='2FA code (or will prompt)')
     parser.add_argument('--limit', type=int, default=10, help='Max accounts to follow')
     parser.add_argument('--headless', action='store_true', help='Run browser in headless mode')
+    parser.add_argument('--profile-dir', default=str(Path.home() / '.ig_selenium_profile'),
+                        help='Chrome profile directory used to keep the login between runs')
     parser.add_argument('--config', default='config.yaml', help='Config file path')
     
     args = parser.parse_args()
@@ -174,7 +213,8 @@ def main():
         return
     
     with open(config_path, 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f) or {}
+        # Use the libyaml C loader when available
+        config = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader)) or {}
     
     # Get Instagram settings
     instagram_config = config.get('instagram', {})
@@ -189,23 +229,23 @@ def main():
     log_message("", log_file)
     
     # Setup browser
-    driver = setup_driver(headless=args.headless)
+    driver = setup_driver(headless=args.headless, profile_dir=args.profile_dir)
     
     try:
-        # Login
-        if not login_instagram(driver, username, password, args.twofa):
+        # Login (skipped when the saved profile is still logged in)
+        if is_logged_in(driver):
+            log_message("✓ Using existing browser session", log_file)
+        elif not login_instagram(driver, username, password, args.twofa):
             log_message("Failed to login. Exiting.", log_file)
             return
         
         # Get target accounts
         pdf_text_file = config.get('files', {}).get('pdf_text', 'playlist_contacts.txt')
-        parser = PDFParser(pdf_text_file)
-        all_contacts = parser.parse()
+        all_contacts = load_contacts_cached(pdf_text_file)
         
         # Filter contacts with Instagram
-        from follow_instagram import filter_by_genres, extract_instagram_username
-        genre_keywords = config.get('email', {}).get('genre_keywords', [])
-        exclude_genres = config.get('email', {}).get('exclude_genres', [])
+        genre_keywords = tuple(k.lower() for k in config.get('email', {}).get('genre_keywords', []))
+        exclude_genres = tuple(k.lower() for k in config.get('email', {}).get('exclude_genres', []))
         
         contacts_with_instagram = [c for c in all_contacts if c.instagram]
         if genre_keywords:
@@ -1,11 +1,15 @@
+import io
 import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 
 def find_first_existing(*filenames):
-    for f in filenames:
-        if os.path.isfile(f):
-            return f
-    return None
+    # Candidates are bare names in the working directory - list it once
+    # instead of stat()ing each one
+    with os.scandir(".") as it:
+        entries = {e.name for e in it if e.is_file()}
+    return next((f for f in filenames if f in entries), None)
 
 def get_or_prompt(label, *default_candidates):
     found = find_first_existing(*default_candidates)
@@ -18,9 +22,8 @@ def get_or_prompt(label, *default_candidates):
             return path
         print(f"❌ File not found: {path}")
 
-def crop_center(img, target_size):
+def crop_center_box(w, h, target_size):
     aspect_ratio = target_size[0] / target_size[1]
-    w, h = img.size
     current_ratio = w / h
     if current_ratio > aspect_ratio:
         new_width = int(h * aspect_ratio)
@@ -30,57 +33,121 @@ def crop_center(img, target_size):
         new_height = int(w / aspect_ratio)
         offset = (h - new_height) // 2
         box = (0, offset, w, offset + new_height)
-    return img.crop(box)
+    return box
 
-def resize_and_save(image_file, output_path, size):
-    img = Image.open(image_file).convert("RGB")
-    img = crop_center(img, size)
-    img = img.resize(size, Image.LANCZOS)
-    img.save(output_path, format="JPEG", quality=95)
+def load_rgb(image_file, sizes=()):
+    img = Image.open(image_file)
+    if sizes:
+        # Let the JPEG decoder downscale (1/2, 1/4, 1/8) while every output
+        # still gets at least 2x its pixels from the centre crop
+        w, h = img.size
+        scale = min(min(w / size[0], h / size[1]) for size in sizes)
+        img.draft("RGB", (int(w * 2 / scale), int(h * 2 / scale)))
+    # convert() copies the whole image even when the mode already matches
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    # Decode now, so threads sharing the image never race to load it
+    img.load()
+    return img
 
-# === Setup ===
-ARTIST_NAME = input("Enter artist name (e.g., Charley Ramsay): ").strip().replace(" ", "_")
-BASE_DIR = f"{ARTIST_NAME}_Media_Kit"
-os.makedirs(BASE_DIR, exist_ok=True)
+def resize_and_save(img, output_path, size):
+    # Crop and resample in one pass, without an intermediate cropped image
+    box = crop_center_box(img.width, img.height, size)
+    # Past 8x a box average is indistinguishable from Lanczos and much cheaper
+    downscale = max((box[2] - box[0]) / size[0], (box[3] - box[1]) / size[1])
+    img = img.resize(size, Image.BOX if downscale > 8 else Image.LANCZOS, box=box)
+    # Optimized progressive encoding only pays off on the large outputs; the
+    # small ones keep full-resolution colour (4:4:4) so thin banners don't alias
+    optimize = size[0] * size[1] > 500_000
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=95, optimize=optimize,
+             progressive=optimize, subsampling=-1 if optimize else 0)
+    # Write the encoded JPEG in one go and rename it into place, so an
+    # interrupted run never leaves a truncated image behind
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(buf.getbuffer())
+    os.replace(tmp_path, output_path)
 
-# === Look for files ===
-album_art = get_or_prompt("album art", "album_cover.jpg")
-portrait = get_or_prompt("portrait image", "profile.jpg", "profile.jpeg")
-wide = get_or_prompt("wide/banner image", "banner.jpg")
+def render_outputs(executor, image_file, outputs):
+    img = load_rgb(image_file, [size for _, size in outputs])
+    written = {}
+    renders = []
+    copies = []
+    for output_path, size in outputs:
+        # Same source and size gives the same JPEG - copy it instead of re-encoding
+        if size in written:
+            copies.append((written[size], output_path))
+            continue
+        renders.append(executor.submit(resize_and_save, img, output_path, size))
+        written[size] = output_path
+    for render in renders:
+        render.result()
+    for src, dst in copies:
+        shutil.copyfile(src, dst)
 
-folders = [
-    "Profile_Photos", "Banner_Images", "Album_Art",
-    "Promo_Assets", "Live_Photos", "Source"
-]
-for folder in folders:
-    os.makedirs(os.path.join(BASE_DIR, folder), exist_ok=True)
+def main():
+    # === Setup ===
+    ARTIST_NAME = input("Enter artist name (e.g., Charley Ramsay): ").strip().replace(" ", "_")
+    BASE_DIR = f"{ARTIST_NAME}_Media_Kit"
+    os.makedirs(BASE_DIR, exist_ok=True)
 
-# === Profile photos ===
-resize_and_save(portrait, f"{BASE_DIR}/Profile_Photos/profile_sq_1080x1080.jpg", (1080, 1080))
-resize_and_save(portrait, f"{BASE_DIR}/Profile_Photos/profile_sq_750x750.jpg", (750, 750))
+    # === Look for files ===
+    album_art = get_or_prompt("album art", "album_cover.jpg")
+    portrait = get_or_prompt("portrait image", "profile.jpg", "profile.jpeg")
+    wide = get_or_prompt("wide/banner image", "banner.jpg")
 
-# === Banner images ===
-resize_and_save(wide, f"{BASE_DIR}/Banner_Images/fb_banner_1640x856.jpg", (1640, 856))
-resize_and_save(wide, f"{BASE_DIR}/Banner_Images/yt_banner_2560x1440_safe1546x423.jpg", (2560, 1440))
-resize_and_save(wide, f"{BASE_DIR}/Banner_Images/spotify_header_2660x1140.jpg", (2660, 1140))
-resize_and_save(wide, f"{BASE_DIR}/Banner_Images/bandcamp_banner_975x40.jpg", (975, 40))
-resize_and_save(wide, f"{BASE_DIR}/Banner_Images/reverbnation_banner_1240x260.jpg", (1240, 260))
-resize_and_save(wide, f"{BASE_DIR}/Banner_Images/soundcloud_banner_2480x520.jpg", (2480, 520))
+    folders = [
+        "Profile_Photos", "Banner_Images", "Album_Art",
+        "Promo_Assets", "Live_Photos", "Source"
+    ]
+    for folder in folders:
+        os.makedirs(os.path.join(BASE_DIR, folder), exist_ok=True)
 
-# === Album Art ===
-resize_and_save(album_art, f"{BASE_DIR}/Album_Art/album_3000x3000.jpg", (3000, 3000))
+    # === Outputs, grouped by source so each source is decoded once ===
+    jobs = [
+        (portrait, [
+            # Profile photos
+            (f"{BASE_DIR}/Profile_Photos/profile_sq_1080x1080.jpg", (1080, 1080)),
+            (f"{BASE_DIR}/Profile_Photos/profile_sq_750x750.jpg", (750, 750)),
+            # Promo assets
+            (f"{BASE_DIR}/Promo_Assets/ig_post_1080x1080.jpg", (1080, 1080)),
+            (f"{BASE_DIR}/Promo_Assets/ig_story_1080x1920.jpg", (1080, 1920)),
+        ]),
+        (wide, [
+            # Banner images
+            (f"{BASE_DIR}/Banner_Images/fb_banner_1640x856.jpg", (1640, 856)),
+            (f"{BASE_DIR}/Banner_Images/yt_banner_2560x1440_safe1546x423.jpg", (2560, 1440)),
+            (f"{BASE_DIR}/Banner_Images/spotify_header_2660x1140.jpg", (2660, 1140)),
+            (f"{BASE_DIR}/Banner_Images/bandcamp_banner_975x40.jpg", (975, 40)),
+            (f"{BASE_DIR}/Banner_Images/reverbnation_banner_1240x260.jpg", (1240, 260)),
+            (f"{BASE_DIR}/Banner_Images/soundcloud_banner_2480x520.jpg", (2480, 520)),
+            # Promo assets
+            (f"{BASE_DIR}/Promo_Assets/yt_thumb_1280x720.jpg", (1280, 720)),
+            (f"{BASE_DIR}/Promo_Assets/fb_event_1920x1005.jpg", (1920, 1005)),
+        ]),
+        (album_art, [
+            # Album art
+            (f"{BASE_DIR}/Album_Art/album_3000x3000.jpg", (3000, 3000)),
+        ]),
+    ]
 
-# === Promo Assets ===
-resize_and_save(portrait, f"{BASE_DIR}/Promo_Assets/ig_post_1080x1080.jpg", (1080, 1080))
-resize_and_save(portrait, f"{BASE_DIR}/Promo_Assets/ig_story_1080x1920.jpg", (1080, 1920))
-resize_and_save(wide, f"{BASE_DIR}/Promo_Assets/yt_thumb_1280x720.jpg", (1280, 720))
-resize_and_save(wide, f"{BASE_DIR}/Promo_Assets/fb_event_1920x1005.jpg", (1920, 1005))
+    # === Render in parallel threads ===
+    # Pillow releases the GIL while decoding, resampling and encoding, so
+    # threads share each decoded source instead of copying it to processes
+    workers = os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=len(jobs)) as decoders, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        list(decoders.map(lambda job: render_outputs(executor, *job), jobs))
 
-# === Originals ===
-os.system(f'cp "{album_art}" "{BASE_DIR}/Source/album_art.jpg"')
-os.system(f'cp "{portrait}" "{BASE_DIR}/Live_Photos/portrait.jpg"')
-os.system(f'cp "{wide}" "{BASE_DIR}/Live_Photos/wide.jpg"')
-os.system(f'cp "{portrait}" "{BASE_DIR}/Source/profile.jpg"')
-os.system(f'cp "{wide}" "{BASE_DIR}/Source/banner.jpg"')
+    # === Originals ===
+    shutil.copyfile(album_art, f"{BASE_DIR}/Source/album_art.jpg")
+    shutil.copyfile(portrait, f"{BASE_DIR}/Live_Photos/portrait.jpg")
+    shutil.copyfile(wide, f"{BASE_DIR}/Live_Photos/wide.jpg")
+    shutil.copyfile(portrait, f"{BASE_DIR}/Source/profile.jpg")
+    shutil.copyfile(wide, f"{BASE_DIR}/Source/banner.jpg")
 
-print(f"\\n✅ Media kit created at: {BASE_DIR}")
+    print(f"\\n✅ Media kit created at: {BASE_DIR}")
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,14 @@ Create Gmail drafts using Gmail API.
 """
 
 import os
+import re
 import base64
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from typing import Optional, List
+import binascii
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from email.header import Header
+from email.utils import formataddr, getaddresses
+from typing import Callable, Dict, Optional, List
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
@@ -15,15 +19,75 @@ from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
 
+# DOCTYPE, html/body tags, or common HTML elements (one case-insensitive scan)
+HTML_BODY_RE = re.compile(r'<(?:!doctype|html>|body>|p>|strong>|a href|div)', re.IGNORECASE)
+
+# Raw single-part message; built directly rather than through email.mime,
+# whose header handling and generator dominate the cost of encoding a draft
+MESSAGE_TEMPLATE = (
+    b'Content-Type: text/%(subtype)b; charset="utf-8"\n'
+    b'MIME-Version: 1.0\n'
+    b'Content-Transfer-Encoding: base64\n'
+    b'%(headers)b'
+    b'\n'
+    b'%(body)b'
+)
+
+# Standard -> URL-safe base64 alphabet, for encoding raw messages with binascii
+URLSAFE_TRANS = bytes.maketrans(b'+/', b'-_')
+
+
+def encode_address(pair: tuple) -> str:
+    """
+    Format a (name, address) pair for an address header, RFC 2047-encoding the name.
+    
+    Internationalized domains are IDNA-encoded. An address with a UTF-8 local
+    part can't be written as ASCII, so the whole pair is RFC 2047-encoded instead.
+    """
+    try:
+        return formataddr(pair, 'utf-8')
+    except UnicodeEncodeError:
+        name, address = pair
+        local, _, domain = address.rpartition('@')
+        if local.isascii():
+            try:
+                return formataddr((name, f"{local}@{domain.encode('idna').decode('ascii')}"), 'utf-8')
+            except UnicodeError:
+                pass
+        return Header(f'{name} <{address}>' if name else address, 'utf-8').encode()
+
+
+def encode_header_value(value: str, addresses: bool = False) -> bytes:
+    """
+    Encode a header value, using RFC 2047 only when it isn't plain ASCII.
+    
+    For address headers only the display names are encoded.
+    """
+    value = ' '.join(value.splitlines())
+    if value.isascii():
+        return value.encode('ascii')
+    if addresses:
+        return ', '.join(encode_address(pair) for pair in getaddresses([value])).encode('ascii')
+    return Header(value, 'utf-8').encode().encode('ascii')
+
+
 class GmailDraftCreator:
     """Create Gmail drafts using the Gmail API."""
     
     SCOPES = ['https://www.googleapis.com/auth/gmail.compose', 'https://www.googleapis.com/auth/gmail.send']
     
+    # Calls per batch request - Gmail allows 100, but recommends 50 or fewer
+    # to stay under the per-user rate limit
+    BATCH_SIZE = 50
+    
+    # Encoded (subject, body) pairs kept for reuse across recipients
+    BODY_CACHE_SIZE = 64
+    
     def __init__(self, credentials_file: str = 'credentials.json', token_file: str = 'token.json'):
         self.credentials_file = credentials_file
         self.token_file = token_file
         self.service = None
+        self._body_cache = {}
     
     def authenticate(self):
         """Authenticate with Gmail API."""
@@ -60,8 +124,81 @@ class GmailDraftCreator:
         self.service = build('gmail', 'v1', credentials=creds)
         return self.service
     
+    def _build_raw_message(self, to_email: str, subject: str, body: str,
+                           from_email: Optional[str] = None,
+                           cc_email: Optional[str] = None,
+                           is_html: Optional[bool] = None) -> str:
+        """
+        Build the MIME message and return it base64url-encoded for the Gmail API.
+        
+        If is_html is None the body type is detected from the body itself.
+        """
+        subject_header, encoded_body = self._encode_subject_and_body(subject, body)
+        headers = [b'to: ' + encode_header_value(to_email, addresses=True) + b'\n', subject_header]
+        if from_email:
+            headers.append(b'from: ' + encode_header_value(from_email, addresses=True) + b'\n')
+        if cc_email:
+            headers.append(b'Cc: ' + encode_header_value(cc_email, addresses=True) + b'\n')
+        
+        if is_html is None:
+            # Detect if body is HTML - check for DOCTYPE, html tags, or common HTML elements
+            is_html = HTML_BODY_RE.search(body) is not None
+        
+        # Single-part message: HTML only (no plain text fallback, so Gmail always
+        # displays HTML), or plain text only
+        msg_bytes = MESSAGE_TEMPLATE % {
+            b'subtype': b'html' if is_html else b'plain',
+            b'headers': b''.join(headers),
+            b'body': encoded_body,
+        }
+        
+        # Encode message (same output as base64.urlsafe_b64encode, without the wrapper)
+        return binascii.b2a_base64(msg_bytes, newline=False).translate(URLSAFE_TRANS).decode('ascii')
+    
+    def _encode_subject_and_body(self, subject: str, body: str) -> tuple:
+        """
+        Return the encoded subject header and the base64-encoded body.
+        
+        Results are cached by a digest of (subject, body), so a message sent to
+        many recipients is only encoded once.
+        """
+        body_bytes = body.encode('utf-8')
+        digest = hashlib.blake2b(subject.encode('utf-8'), digest_size=16)
+        digest.update(b'\0')
+        digest.update(body_bytes)
+        key = digest.digest()
+        cached = self._body_cache.get(key)
+        if cached is None:
+            cached = (b'subject: ' + encode_header_value(subject) + b'\n',
+                      base64.encodebytes(body_bytes))
+            if len(self._body_cache) >= self.BODY_CACHE_SIZE:
+                self._body_cache.clear()
+            self._body_cache[key] = cached
+        return cached
+    
+    def _raw_message_for(self, info: dict) -> str:
+        """
+        Return the encoded message for a draft/email dict.
+        
+        The message is built once and stored under 'raw', so a dict that is
+        retried (or already carries 'raw') is not encoded again.
+        """
+        raw_message = info.get('raw')
+        if raw_message is None:
+            raw_message = self._build_raw_message(
+                info.get('to_email'),
+                info.get('subject', ''),
+                info.get('body', ''),
+                info.get('from_email'),
+                info.get('cc_email'),
+                info.get('is_html')
+            )
+            info['raw'] = raw_message
+        return raw_message
+    
     def create_draft(self, to_email: str, subject: str, body: str, 
-                    from_email: Optional[str] = None) -> Optional[str]:
+                    from_email: Optional[str] = None,
+                    is_html: Optional[bool] = None) -> Optional[str]:
         """
         Create a Gmail draft.
         
@@ -70,58 +207,24 @@ class GmailDraftCreator:
             subject: Email subject
             body: Email body (HTML or plain text)
             from_email: Sender email (optional, uses authenticated account if not provided)
+            is_html: Whether the body is HTML (optional, detected from the body if not provided)
         
         Returns:
             Draft ID if successful, None otherwise
         """
+        try:
+            raw_message = self._build_raw_message(to_email, subject, body, from_email, is_html=is_html)
+        except (UnicodeError, ValueError) as error:
+            print(f"Could not build draft to {to_email}: {error}")
+            return None
+        return self._create_draft_from_raw(raw_message)
+    
+    def _create_draft_from_raw(self, raw_message: str) -> Optional[str]:
+        """Create a Gmail draft from an already encoded message."""
         if not self.service:
             self.authenticate()
         
         try:
-            # Create message
-            message = MIMEMultipart('alternative')
-            message['to'] = to_email
-            message['subject'] = subject
-            if from_email:
-                message['from'] = from_email
-            
-            # Detect if body is HTML - check for DOCTYPE, html tags, or common HTML elements
-            is_html = ('<!DOCTYPE' in body.upper() or 
-                      '<html>' in body.lower() or 
-                      '<body>' in body.lower() or 
-                      '<p>' in body.lower() or 
-                      '<strong>' in body.lower() or 
-                      '<a href' in body.lower() or
-                      '<div' in body.lower())
-            
-            if is_html:
-                # Force HTML-only for drafts too - no plain text fallback
-                msg_html = MIMEText(body, 'html', 'utf-8')
-                msg_html.set_charset('utf-8')
-                # Remove any existing Content-Type and set explicitly
-                if 'Content-Type' in msg_html:
-                    del msg_html['Content-Type']
-                msg_html.add_header('Content-Type', 'text/html; charset=utf-8')
-                msg_html.add_header('Content-Transfer-Encoding', 'quoted-printable')
-                
-                # Attach HTML ONLY - no plain text fallback to force HTML rendering
-                message.attach(msg_html)
-            else:
-                # Plain text only
-                msg_text = MIMEText(body, 'plain', 'utf-8')
-                msg_text.add_header('Content-Type', 'text/plain; charset=utf-8')
-                message.attach(msg_text)
-            
-            # Encode message
-            raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
-            
-            # Debug: Check message structure
-            if is_html:
-                msg_bytes = message.as_bytes()
-                msg_str = msg_bytes.decode('utf-8', errors='ignore')
-                if 'Content-Type: text/html' not in msg_str:
-                    print("WARNING: HTML Content-Type not found in message structure")
-            
             # Create draft
             draft = self.service.users().drafts().create(
                 userId='me',
@@ -134,25 +237,105 @@ class GmailDraftCreator:
             print(f"An error occurred creating draft: {error}")
             return None
     
+    def _execute_batch(self, items: List[dict], build_request: Callable,
+                       error_label: str, fallback: Optional[Callable] = None) -> Dict[int, str]:
+        """
+        Run one Gmail API call per item using batch requests of up to BATCH_SIZE calls.
+        
+        Building a chunk's requests (MIME encoding) overlaps with sending the
+        previous chunk.
+        
+        Args:
+            items: Items to process
+            build_request: Function item -> unexecuted API request
+            error_label: Used in error messages, e.g. "creating draft"
+            fallback: Function item -> ID, used one by one for a chunk whose
+                      whole batch request failed (None = leave those items failed)
+        
+        Returns:
+            Dict of item index -> returned ID for the successful calls
+        """
+        if not self.service:
+            self.authenticate()
+        
+        ids = {}
+        
+        def on_response(request_id, response, exception):
+            if exception is not None:
+                print(f"An error occurred {error_label}: {exception}")
+                return
+            ids[int(request_id)] = response.get('id')
+        
+        def finish(future, chunk):
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Batch request failed while {error_label}: {e}")
+                if not fallback:
+                    return
+                # Process this chunk one by one
+                for index, item in chunk:
+                    if index not in ids:
+                        ids[index] = fallback(item)
+        
+        # The next chunk's messages are built while the previous batch is in
+        # flight. Only one batch executes at a time and the fallback runs after
+        # it finishes, so the (not thread-safe) HTTP client is never shared.
+        in_flight = None
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            for start in range(0, len(items), self.BATCH_SIZE):
+                batch = self.service.new_batch_http_request(callback=on_response)
+                chunk = []
+                for index, item in enumerate(items[start:start + self.BATCH_SIZE], start):
+                    # An item whose message can't be built is left failed;
+                    # the rest of the batch still goes out
+                    try:
+                        batch.add(build_request(item), request_id=str(index))
+                    except (UnicodeError, ValueError) as e:
+                        print(f"Could not build request while {error_label}: {e}")
+                        continue
+                    chunk.append((index, item))
+                
+                if in_flight:
+                    finish(*in_flight)
+                in_flight = (executor.submit(batch.execute), chunk)
+            
+            if in_flight:
+                finish(*in_flight)
+        
+        return ids
+    
     def create_drafts_batch(self, drafts_data: List[dict]) -> List[dict]:
         """
         Create multiple drafts in batch.
         
+        Drafts are sent to Gmail in batch requests of up to BATCH_SIZE calls,
+        so N drafts take about N / BATCH_SIZE round trips.
+        
         Args:
-            drafts_data: List of dicts with keys: to_email, subject, body, from_email (optional)
+            drafts_data: List of dicts with keys: to_email, subject, body, from_email (optional),
+                         cc_email (optional), is_html (optional)
         
         Returns:
             List of results with 'success', 'draft_id', 'to_email', 'error' keys
         """
+        def build_request(draft_info):
+            return self.service.users().drafts().create(
+                userId='me',
+                body={'message': {'raw': self._raw_message_for(draft_info)}}
+            )
+        
+        def fallback(draft_info):
+            # Reuses the message encoded for the failed batch
+            return self._create_draft_from_raw(self._raw_message_for(draft_info))
+        
+        draft_ids = self._execute_batch(drafts_data, build_request, "creating draft", fallback)
+        
         results = []
         
-        for draft_info in drafts_data:
+        for index, draft_info in enumerate(drafts_data):
             to_email = draft_info.get('to_email')
-            subject = draft_info.get('subject', '')
-            body = draft_info.get('body', '')
-            from_email = draft_info.get('from_email')
-            
-            draft_id = self.create_draft(to_email, subject, body, from_email)
+            draft_id = draft_ids.get(index)
             
             if draft_id:
                 results.append({
@@ -171,8 +354,55 @@ class GmailDraftCreator:
         
         return results
     
+    def send_emails_batch(self, emails_data: List[dict]) -> List[dict]:
+        """
+        Send multiple emails in batch.
+        
+        Emails are sent in batch requests of up to BATCH_SIZE calls. If a whole
+        batch request fails, its emails are reported as failed rather than
+        retried, since some of them may already have been sent.
+        
+        Args:
+            emails_data: List of dicts with keys: to_email, subject, body,
+                         from_email (optional), cc_email (optional), is_html (optional)
+        
+        Returns:
+            List of results with 'success', 'message_id', 'to_email', 'error' keys
+        """
+        def build_request(email_info):
+            return self.service.users().messages().send(
+                userId='me',
+                body={'raw': self._raw_message_for(email_info)}
+            )
+        
+        message_ids = self._execute_batch(emails_data, build_request, "sending email")
+        
+        results = []
+        
+        for index, email_info in enumerate(emails_data):
+            to_email = email_info.get('to_email')
+            message_id = message_ids.get(index)
+            
+            if message_id:
+                results.append({
+                    'success': True,
+                    'message_id': message_id,
+                    'to_email': to_email,
+                    'error': None
+                })
+            else:
+                results.append({
+                    'success': False,
+                    'message_id': None,
+                    'to_email': to_email,
+                    'error': 'Failed to send email'
+                })
+        
+        return results
+    
     def send_email(self, to_email: str, subject: str, body: str, 
-                   from_email: Optional[str] = None, cc_email: Optional[str] = None) -> Optional[str]:
+                   from_email: Optional[str] = None, cc_email: Optional[str] = None,
+                   is_html: Optional[bool] = None) -> Optional[str]:
         """
         Send an email directly (not a draft).
         
@@ -182,6 +412,7 @@ class GmailDraftCreator:
             body: Email body (HTML or plain text)
             from_email: Sender email (optional, uses authenticated account if not provided)
             cc_email: CC email address (optional)
+            is_html: Whether the body is HTML (optional, detected from the body if not provided)
         
         Returns:
             Message ID if successful, None otherwise
@@ -190,45 +421,7 @@ class GmailDraftCreator:
             self.authenticate()
         
         try:
-            # Create message
-            message = MIMEMultipart('alternative')
-            message['to'] = to_email
-            message['subject'] = subject
-            if from_email:
-                message['from'] = from_email
-            if cc_email:
-                message['Cc'] = cc_email
-            
-            # Detect if body is HTML - check for DOCTYPE, html tags, or common HTML elements
-            is_html = ('<!DOCTYPE' in body.upper() or 
-                      '<html>' in body.lower() or 
-                      '<body>' in body.lower() or 
-                      '<p>' in body.lower() or 
-                      '<strong>' in body.lower() or 
-                      '<a href' in body.lower() or
-                      '<div' in body.lower())
-            
-            if is_html:
-                # Force HTML-only email - don't include plain text fallback
-                # This ensures Gmail always displays HTML
-                msg_html = MIMEText(body, 'html', 'utf-8')
-                msg_html.set_charset('utf-8')
-                # Remove any existing Content-Type and set explicitly
-                if 'Content-Type' in msg_html:
-                    del msg_html['Content-Type']
-                msg_html.add_header('Content-Type', 'text/html; charset=utf-8')
-                msg_html.add_header('Content-Transfer-Encoding', 'quoted-printable')
-                
-                # Attach HTML ONLY - no plain text fallback to force HTML rendering
-                message.attach(msg_html)
-            else:
-                # Plain text only
-                msg_text = MIMEText(body, 'plain', 'utf-8')
-                msg_text.add_header('Content-Type', 'text/plain; charset=utf-8')
-                message.attach(msg_text)
-            
-            # Encode message
-            raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
+            raw_message = self._build_raw_message(to_email, subject, body, from_email, cc_email, is_html)
             
             # Send email
             sent_message = self.service.users().messages().send(
@@ -238,6 +431,10 @@ class GmailDraftCreator:
             
             return sent_message.get('id')
         
+        except (UnicodeError, ValueError) as error:
+            print(f"Could not build email to {to_email}: {error}")
+            return None
+        
         except HttpError as error:
             print(f"An error occurred sending email: {error}")
             return None
@@ -3,14 +3,50 @@
 Parse Spotify Playlist Contacts PDF and extract structured contact information.
 """
 
+import io
+import os
 import re
-from typing import List, Dict, Optional
-from dataclasses import dataclass
+import sys
+import hashlib
+import pickle
+from pathlib import Path
+from functools import lru_cache
+from typing import FrozenSet, List, Dict, Optional
+from dataclasses import dataclass, field
 
 
-@dataclass
+# Column header lines repeated on every PDF page
+HEADER_LINES = frozenset(['Playlist Name', 'Curator', 'Genres', 'Followers', 'Best Way To Contact'])
+
+EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+
+# Follower counts, matched after commas and spaces are removed
+FOLLOWERS_RE = re.compile(r'^\d+[,\d]*\s*$')
+
+# Bump when PDFParser.parse or the PlaylistContact fields change, so pickled
+# contacts from load_contacts_cached are re-parsed rather than served stale
+CONTACTS_CACHE_VERSION = 1
+
+
+@lru_cache(maxsize=4096)
+def tokenize_genres(genres: str) -> FrozenSet[str]:
+    """Split a comma-separated genre string into a set of lowercased genre tokens."""
+    return frozenset(token for token in (g.strip().lower() for g in genres.split(',')) if token)
+
+
+@lru_cache(maxsize=None)
+def compile_keywords(keywords: tuple):
+    """
+    Compile genre keywords into one alternation regex (cached).
+    
+    Keywords are lowercased here, so the pattern is meant for lowercased genre strings.
+    """
+    return re.compile('|'.join(re.escape(keyword.lower()) for keyword in keywords))
+
+
+@dataclass(slots=True)
 class PlaylistContact:
-    """Represents a playlist contact entry."""
+    """Represents a playlist contact entry (slotted - thousands are created per parse)."""
     playlist_name: str = ""
     curator: str = ""
     genres: str = ""
@@ -19,10 +55,24 @@ class PlaylistContact:
     email: str = ""
     instagram: str = ""
     other_links: List[str] = None
+    # (genres, genres.lower()) for the genres value last lowercased
+    _genres_lower: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
     
     def __post_init__(self):
         if self.other_links is None:
             self.other_links = []
+    
+    @property
+    def genres_lower(self) -> str:
+        """Lowercased genres, recomputed only when genres changes."""
+        if self._genres_lower is None or self._genres_lower[0] is not self.genres:
+            self._genres_lower = (self.genres, (self.genres or '').lower())
+        return self._genres_lower[1]
+    
+    @property
+    def genre_tokens(self) -> FrozenSet[str]:
+        """Lowercased genre tokens, e.g. {'rap', 'rock', 'hip hop'}."""
+        return tokenize_genres(self.genres or '')
 
 
 class PDFParser:
@@ -31,11 +81,27 @@ class PDFParser:
     def __init__(self, pdf_text_file: str):
         self.pdf_text_file = pdf_text_file
         self.contacts: List[PlaylistContact] = []
+        self._contacts_by_email: Optional[Dict[str, PlaylistContact]] = None
+        self._data: Optional[bytes] = None
+    
+    @classmethod
+    def from_bytes(cls, data: bytes, pdf_text_file: str = '') -> 'PDFParser':
+        """Create a parser for PDF text that has already been read into memory."""
+        parser = cls(pdf_text_file)
+        parser._data = data
+        return parser
     
     def parse(self) -> List[PlaylistContact]:
         """Parse the PDF text file and return list of PlaylistContact objects."""
-        with open(self.pdf_text_file, 'r', encoding='utf-8', errors='ignore') as f:
+        if self._data is not None:
+            # Same decoding and newline handling as reading the file in text mode
+            f = io.StringIO(self._data.decode('utf-8', errors='ignore'), newline=None)
             lines = [line.strip() for line in f.readlines()]
+        else:
+            with open(self.pdf_text_file, 'r', encoding='utf-8', errors='ignore') as f:
+                lines = [line.strip() for line in f.readlines()]
+        # Lowercased copy for the URL checks and Spotify lookbacks below
+        lines_lower = [line.lower() for line in lines]
         
         contacts = []
         current_contact = PlaylistContact()
@@ -44,9 +110,10 @@ class PDFParser:
         i = 0
         while i < len(lines):
             line = lines[i]
+            line_lower = lines_lower[i]
             
             # Skip header lines
-            if line in ['Playlist Name', 'Curator', 'Genres', 'Followers', 'Best Way To Contact']:
+            if line in HEADER_LINES:
                 i += 1
                 continue
             
@@ -56,7 +123,7 @@ class PDFParser:
                 continue
             
             # Detect email addresses - this is our key anchor point
-            email_match = re.search(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', line)
+            email_match = EMAIL_RE.search(line)
             if email_match:
                 # Save previous contact if it has data
                 if current_contact.email or current_contact.spotify_url:
@@ -83,7 +150,7 @@ class PDFParser:
                 # Structure: Playlist -> Curator -> Spotify URL -> Genres -> Followers -> Email
                 spotify_idx = None
                 for j in range(max(0, i-20), i):
-                    if 'spotify.com' in lines[j].lower():
+                    if 'spotify.com' in lines_lower[j]:
                         spotify_idx = j
                         break
                 
@@ -104,8 +171,8 @@ class PDFParser:
                             '@' not in curator_candidate and 
                             'spotify' not in curator_candidate.lower() and
                             not curator_candidate.startswith('http') and
-                            not re.match(r'^\d+[,\d]*\s*$', curator_candidate.replace(',', '').replace(' ', '')) and
-                            curator_candidate not in ['Playlist Name', 'Curator', 'Genres', 'Followers', 'Best Way To Contact']):
+                            not FOLLOWERS_RE.match(curator_candidate.replace(',', '').replace(' ', '')) and
+                            curator_candidate not in HEADER_LINES):
                             
                             # Check if it's not genres - improved detection
                             # Genres are usually ALL CAPS, have commas, or are common genre words
@@ -139,11 +206,11 @@ class PDFParser:
                                     
                                     # Skip if it contains @ (email) or is a number (followers)
                                     if ('@' in playlist_candidate or 
-                                        re.match(r'^\d+[,\d]*\s*$', playlist_candidate.replace(',', '').replace(' ', ''))):
+                                        FOLLOWERS_RE.match(playlist_candidate.replace(',', '').replace(' ', ''))):
                                         continue
                                     
                                     # Skip header labels
-                                    if playlist_candidate in ['Playlist Name', 'Curator', 'Genres', 'Followers', 'Best Way To Contact']:
+                                    if playlist_candidate in HEADER_LINES:
                                         continue
                                     
                                     # Check if it's genres (usually have commas and genre keywords, or are very long)
@@ -172,7 +239,7 @@ class PDFParser:
                         current_contact.genres = remaining
             
             # Detect Spotify URLs
-            elif 'spotify.com' in line.lower():
+            elif 'spotify.com' in line_lower:
                 if current_contact.email:
                     # We have a contact, add to it
                     if not current_contact.spotify_url:
@@ -194,8 +261,8 @@ class PDFParser:
                                     'instagram.com' not in next_line.lower() and
                                     'spotify.com' not in next_line.lower() and
                                     'www.' not in next_line.lower() and
-                                    not re.match(r'^\d+[,\d]*\s*$', next_line.replace(',', '').replace(' ', '')) and
-                                    next_line not in ['Playlist Name', 'Curator', 'Genres', 'Followers', 'Best Way To Contact']):
+                                    not FOLLOWERS_RE.match(next_line.replace(',', '').replace(' ', '')) and
+                                    next_line not in HEADER_LINES):
                                     # Check if it's not genres
                                     is_genre = (
                                         (any(indicator in next_line.upper() for indicator in genre_indicators) and 
@@ -211,7 +278,7 @@ class PDFParser:
                     pending_data['spotify_url'] = line
             
             # Detect Instagram URLs
-            elif 'instagram.com' in line.lower():
+            elif 'instagram.com' in line_lower:
                 if current_contact.email:
                     if not current_contact.instagram:
                         current_contact.instagram = line
@@ -221,7 +288,7 @@ class PDFParser:
                         current_contact.other_links.append(line)
             
             # Detect follower counts (numbers with optional commas, usually standalone)
-            elif re.match(r'^\d+[,\d]*\s*$', line.replace(',', '').replace(' ', '')):
+            elif FOLLOWERS_RE.match(line.replace(',', '').replace(' ', '')):
                 followers = line.strip()
                 if current_contact.email:
                     if not current_contact.followers:
@@ -246,7 +313,8 @@ class PDFParser:
                                    'ALTERNATIVE', 'ACOUSTIC', 'DANCE', 'TRIPHOP', 'CHILLWAVE']
                 
                 # Check if this looks like genres
-                if any(indicator in line.upper() for indicator in genre_indicators) and len(line) > 5:
+                line_upper = line.upper()
+                if any(indicator in line_upper for indicator in genre_indicators) and len(line) > 5:
                     if current_contact.email:
                         if current_contact.genres:
                             current_contact.genres += ", " + line
@@ -264,7 +332,7 @@ class PDFParser:
                     # Look backwards from current position to find Spotify URL, then curator, then playlist
                     spotify_idx = None
                     for j in range(max(0, i-15), i):
-                        if 'spotify.com' in lines[j].lower():
+                        if 'spotify.com' in lines_lower[j]:
                             spotify_idx = j
                             break
                     
@@ -279,9 +347,9 @@ class PDFParser:
                                 '@' not in prev_line and 
                                 'spotify' not in prev_line.lower() and
                                 not prev_line.startswith('http') and
-                                not re.match(r'^\d+[,\d]*\s*$', prev_line.replace(',', '').replace(' ', '')) and
+                                not FOLLOWERS_RE.match(prev_line.replace(',', '').replace(' ', '')) and
                                 not any(indicator in prev_line.upper() for indicator in genre_indicators) and
-                                prev_line not in ['Playlist Name', 'Curator', 'Genres', 'Followers', 'Best Way To Contact']):
+                                prev_line not in HEADER_LINES):
                                 
                                 # This is likely the curator
                                 if current_contact.email:
@@ -301,9 +369,9 @@ class PDFParser:
                                     'http' not in playlist_line.lower() and
                                     'instagram.com' not in playlist_line.lower() and
                                     'www.' not in playlist_line.lower() and
-                                    not re.match(r'^\d+[,\d]*\s*$', playlist_line.replace(',', '').replace(' ', '')) and
+                                    not FOLLOWERS_RE.match(playlist_line.replace(',', '').replace(' ', '')) and
                                     not any(indicator in playlist_line.upper() for indicator in genre_indicators) and
-                                    playlist_line not in ['Playlist Name', 'Curator', 'Genres', 'Followers', 'Best Way To Contact']):
+                                    playlist_line not in HEADER_LINES):
                                     
                                     if current_contact.email:
                                         if not current_contact.playlist_name:
@@ -329,24 +397,60 @@ class PDFParser:
                     contact.genres = re.sub(r',+', ',', contact.genres)
                     # Remove any trailing numbers that got mixed in
                     contact.genres = re.sub(r',\s*\d+[,\d]*\s*$', '', contact.genres)
+                    # Many contacts list the same genres - share one string
+                    contact.genres = sys.intern(contact.genres)
                 cleaned_contacts.append(contact)
         
         self.contacts = cleaned_contacts
+        self._contacts_by_email = None
         return cleaned_contacts
     
     def get_contact_by_email(self, email: str) -> Optional[PlaylistContact]:
         """Find a contact by email address (case-insensitive)."""
-        email_lower = email.lower().strip()
-        for contact in self.contacts:
-            if contact.email.lower().strip() == email_lower:
-                return contact
-        return None
+        if self._contacts_by_email is None:
+            # Build the index on first lookup - first contact wins for duplicates
+            self._contacts_by_email = {}
+            for contact in self.contacts:
+                self._contacts_by_email.setdefault(contact.email.lower().strip(), contact)
+        return self._contacts_by_email.get(email.lower().strip())
     
     def get_all_emails(self) -> List[str]:
         """Get all email addresses from parsed contacts."""
         return [c.email for c in self.contacts if c.email]
 
 
+def load_contacts_cached(pdf_text_file: str,
+                         cache_file: str = '.contacts.cache.pkl') -> List[PlaylistContact]:
+    """
+    Parse contacts from the PDF text file, reusing a pickled copy while the file is unchanged.
+    
+    The cache is keyed on CONTACTS_CACHE_VERSION and a BLAKE2 digest of the
+    text file's contents.
+    """
+    data = Path(pdf_text_file).read_bytes()
+    digest = hashlib.blake2b(data).hexdigest()
+    
+    try:
+        with open(cache_file, 'rb') as f:
+            cached_version, cached_digest, contacts = pickle.load(f)
+        if cached_version == CONTACTS_CACHE_VERSION and cached_digest == digest:
+            return contacts
+    except Exception:
+        # Missing, unreadable or outdated cache (unpickling objects whose class
+        # has changed can raise almost anything) - re-parse below
+        pass
+    
+    contacts = PDFParser.from_bytes(data, pdf_text_file).parse()
+    tmp_file = cache_file + '.tmp'
+    try:
+        with open(tmp_file, 'wb') as f:
+            pickle.dump((CONTACTS_CACHE_VERSION, digest, contacts), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        pass  # Not writable here - the cache is only an optimization
+    return contacts
+
+
 if __name__ == '__main__':
     # Test parsing
     parser = PDFParser('playlist_contacts.txt')
@@ -39,7 +39,8 @@ def load_config(config_file='config.yaml'):
     
     try:
         with open(config_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f) or {}
+            # Use the libyaml C loader when available
+            config = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader)) or {}
     except Exception as e:
         print(f"  ⚠ Failed to load config.yaml: {e}")
     
@@ -96,19 +97,19 @@ def save_progress(progress):
 
 
 def filter_by_genres(contact, genre_keywords, exclude_keywords=None):
-    """Check if contact genres match any of the specified keywords."""
+    """Check if contact genres match any of the specified keywords (keywords must be lowercase)."""
     if not contact.genres or not genre_keywords:
         return False
     
-    genres_lower = contact.genres.lower()
+    genres_lower = contact.genres_lower
     
     if exclude_keywords:
         for exclude in exclude_keywords:
-            if exclude.lower() in genres_lower:
+            if exclude in genres_lower:
                 return False
     
     for keyword in genre_keywords:
-        if keyword.lower() in genres_lower:
+        if keyword in genres_lower:
             return True
     
     return False
@@ -187,9 +188,9 @@ def main():
     token = config.get('files', {}).get('token', 'token.json')
     cc_email = config.get('email_settings', {}).get('cc_email', 'charley@ramsays.us')
     
-    # Get genre keywords
-    genre_keywords = config.get('email', {}).get('genre_keywords', [])
-    exclude_genre_keywords = config.get('email', {}).get('exclude_genres', [])
+    # Get genre keywords (lowercased once for filter_by_genres)
+    genre_keywords = tuple(k.lower() for k in config.get('email', {}).get('genre_keywords', []))
+    exclude_genre_keywords = tuple(k.lower() for k in config.get('email', {}).get('exclude_genres', []))
     validate_emails = config.get('email', {}).get('validate_emails', True)
     validation_csv = config.get('email', {}).get('validation_csv')
     
@@ -265,16 +266,17 @@ def main():
     # Generate email content
     log_message("Step 5: Generating email content...", log_file)
     processor = TemplateProcessor(template_file)
+    # Artist details are the same for every email, so render them once
+    processor.bind_defaults(
+        artist_name=artist_name,
+        artist_spotify_link=artist_spotify,
+        artist_instagram=artist_instagram,
+        artist_website=artist_website
+    )
     email_data = []
     
     for contact in remaining_contacts:
-        result = processor.process(
-            contact,
-            artist_name=artist_name,
-            artist_spotify_link=artist_spotify,
-            artist_instagram=artist_instagram,
-            artist_website=artist_website
-        )
+        result = processor.process(contact)
         email_data.append({
             'contact': contact,
             'to_email': contact.email,
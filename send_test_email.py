@@ -21,7 +21,8 @@ def load_config(config_file='config.yaml'):
     
     try:
         with open(config_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f) or {}
+            # Use the libyaml C loader when available
+            config = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader)) or {}
     except Exception as e:
         print(f"  ⚠ Failed to load config.yaml: {e}")
     
@@ -9,6 +9,12 @@ from pathlib import Path
 from typing import Dict, Optional
 from pdf_parser import PlaylistContact
 
+# Markdown stripped from each line of the plain text version
+MD_BOLD_RE = re.compile(r'\*\*(.+?)\*\*')
+MD_HEADER_RE = re.compile(r'##+\s*')
+MD_LIST_MARKER_RE = re.compile(r'^-\s+')
+MD_LINK_RE = re.compile(r'\[([^\]]+)\]\([^\)]+\)')
+
 
 class TemplateProcessor:
     """Process markdown templates with placeholders."""
@@ -16,6 +22,9 @@ class TemplateProcessor:
     def __init__(self, template_file: str = 'email_template.md'):
         self.template_file = Path(template_file)
         self.template_content = None
+        self._body_template = None
+        self._bound_values = None
+        self._bound_body = None
         self.load_template()
     
     def load_template(self):
@@ -25,6 +34,30 @@ class TemplateProcessor:
         
         with open(self.template_file, 'r', encoding='utf-8') as f:
             self.template_content = f.read()
+        
+        # The email body only depends on the template, so extract it once here
+        self._subject_in_template = bool(
+            re.search(r'\*\*Subject:\*\*\s*<<subject>>', self.template_content)
+        )
+        self._body_template = self._extract_body(self.template_content)
+        self._bound_values = None
+        self._bound_body = None
+    
+    def bind_defaults(self, artist_name: Optional[str] = None,
+                      artist_spotify_link: Optional[str] = None,
+                      artist_instagram: Optional[str] = None,
+                      artist_website: Optional[str] = None):
+        """
+        Pre-render the artist placeholders, which are the same for every contact.
+        
+        After binding, process() only substitutes the contact-specific
+        placeholders. Passing any artist_* argument to process() bypasses
+        the bound values for that call.
+        """
+        self._bound_values = self._artist_replacements(
+            artist_name, artist_spotify_link, artist_instagram, artist_website
+        )
+        self._bound_body = self._replace_placeholders(self._body_template, self._bound_values)
     
     def process(self, contact: PlaylistContact, 
                 artist_name: Optional[str] = None,
@@ -52,8 +85,7 @@ class TemplateProcessor:
             playlist_name = email_local.replace('_', ' ').replace('.', ' ').title()
         
         # Extract subject if it's in the template
-        subject_match = re.search(r'\*\*Subject:\*\*\s*<<subject>>', self.template_content)
-        if subject_match:
+        if self._subject_in_template:
             # Subject is in template, generate it based on contact info
             if custom_subject:
                 subject_template = custom_subject
@@ -87,51 +119,25 @@ class TemplateProcessor:
             'genres': relevant_genres or 'various genres',
             'followers': contact.followers or 'N/A',
             'spotify_url': contact.spotify_url or 'N/A',
-            'artist_name': artist_name or '[Your Name]',
             'additional_info': additional_info or '',  # Empty if not provided - template should have content
-            'artist_spotify_link': artist_spotify_link or '[Your Spotify Link]',
-            'artist_instagram': f"@{artist_instagram}" if artist_instagram and not artist_instagram.startswith('@') else (artist_instagram or '[Your Instagram]'),
-            'artist_website': artist_website or '[Your Website]',
         }
         
-        # Process template - extract just the email body
-        body = self.template_content
-        
-        # Find the actual email content (between first --- and Available Placeholders section)
-        lines = body.split('\n')
-        body_lines = []
-        in_email_body = False
-        skip_until_dash = True
-        
-        for line in lines:
-            # Skip until we find the first --- separator
-            if skip_until_dash:
-                if line.strip().startswith('---'):
-                    skip_until_dash = False
-                    in_email_body = True
-                    continue
-                continue
-            
-            # Stop at documentation sections (but keep credentials!)
-            if 'Available Placeholders' in line or 'Example Usage' in line:
-                break
-            
-            # Skip markdown headers (but keep content after them)
-            if line.strip().startswith('#') and not in_email_body:
-                continue
-            
-            if in_email_body:
-                body_lines.append(line)
-        
-        body = '\n'.join(body_lines).strip()
+        use_bound = (self._bound_values is not None and
+                     artist_name is None and artist_spotify_link is None and
+                     artist_instagram is None and artist_website is None)
+        if use_bound:
+            # Artist placeholders are already rendered into the body; messages
+            # may still reference them, so expand those in the (short) values
+            body = self._bound_body
+            for key in ('custom_message', 'additional_info'):
+                replacements[key] = self._replace_placeholders(replacements[key], self._bound_values)
+        else:
+            body = self._body_template
+            replacements.update(self._artist_replacements(
+                artist_name, artist_spotify_link, artist_instagram, artist_website
+            ))
         
-        # Remove subject line if it's in the body
-        body = re.sub(r'\*\*Subject:\*\*\s*.+?\n', '', body)
-        
-        # Replace all placeholders
-        for key, value in replacements.items():
-            placeholder = f'<<{key}>>'
-            body = body.replace(placeholder, str(value))
+        body = self._replace_placeholders(body, replacements)
         
         # Clean up empty sections
         body = re.sub(r'\*\*.*?:\*\*\s*N/A\n', '', body)
@@ -155,10 +161,10 @@ class TemplateProcessor:
                 continue
             prev_was_empty = False
             # Remove markdown formatting
-            plain = re.sub(r'\*\*(.+?)\*\*', r'\1', stripped)  # Remove bold
-            plain = re.sub(r'##+\s*', '', plain)  # Remove headers
-            plain = re.sub(r'^-\s+', '', plain)  # Remove list markers
-            plain = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', plain)  # Remove link formatting
+            plain = MD_BOLD_RE.sub(r'\1', stripped)  # Remove bold
+            plain = MD_HEADER_RE.sub('', plain)  # Remove headers
+            plain = MD_LIST_MARKER_RE.sub('', plain)  # Remove list markers
+            plain = MD_LINK_RE.sub(r'\1', plain)  # Remove link formatting
             if plain:
                 plain_text_lines.append(plain)
         
@@ -170,6 +176,60 @@ class TemplateProcessor:
             'body_plain': plain_text_body.strip()  # Clean plain text version
         }
     
+    @staticmethod
+    def _artist_replacements(artist_name: Optional[str],
+                             artist_spotify_link: Optional[str],
+                             artist_instagram: Optional[str],
+                             artist_website: Optional[str]) -> Dict[str, str]:
+        """Replacement values for the artist placeholders."""
+        return {
+            'artist_name': artist_name or '[Your Name]',
+            'artist_spotify_link': artist_spotify_link or '[Your Spotify Link]',
+            'artist_instagram': f"@{artist_instagram}" if artist_instagram and not artist_instagram.startswith('@') else (artist_instagram or '[Your Instagram]'),
+            'artist_website': artist_website or '[Your Website]',
+        }
+    
+    @staticmethod
+    def _replace_placeholders(text: str, replacements: Dict[str, str]) -> str:
+        """Replace <<key>> placeholders in order."""
+        for key, value in replacements.items():
+            text = text.replace(f'<<{key}>>', str(value))
+        return text
+    
+    @staticmethod
+    def _extract_body(template_content: str) -> str:
+        """Extract the email body from the template, without documentation sections."""
+        # Find the actual email content (between first --- and Available Placeholders section)
+        lines = template_content.split('\n')
+        body_lines = []
+        in_email_body = False
+        skip_until_dash = True
+        
+        for line in lines:
+            # Skip until we find the first --- separator
+            if skip_until_dash:
+                if line.strip().startswith('---'):
+                    skip_until_dash = False
+                    in_email_body = True
+                    continue
+                continue
+            
+            # Stop at documentation sections (but keep credentials!)
+            if 'Available Placeholders' in line or 'Example Usage' in line:
+                break
+            
+            # Skip markdown headers (but keep content after them)
+            if line.strip().startswith('#') and not in_email_body:
+                continue
+            
+            if in_email_body:
+                body_lines.append(line)
+        
+        body = '\n'.join(body_lines).strip()
+        
+        # Remove subject line if it's in the body
+        return re.sub(r'\*\*Subject:\*\*\s*.+?\n', '', body)
+    
     def _markdown_to_html(self, markdown_text: str) -> str:
         """Convert markdown to HTML for email rendering - Gmail-compatible with tables."""
         lines = markdown_text.split('\n')